@@ -8,6 +8,7 @@ Environment Variables:
     ELECTRIFY_BRIDGE_DIR: Override default bridge folder location
 """
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -34,6 +35,9 @@ SNAPSHOT_PATH = BRIDGE_DIR / "snapshot.json"
 # Snapshot metadata (timestamp, version, etc.)
 SNAPSHOT_META_PATH = BRIDGE_DIR / "snapshot.meta.json"
 
+# Snapshot + metadata in one atomically replaced file: {"snapshot": ..., "meta": ...}
+SNAPSHOT_BUNDLE_PATH = BRIDGE_DIR / "snapshot.bundle.json"
+
 # Actions to execute (from Backend → Fusion)
 ACTIONS_PATH = BRIDGE_DIR / "actions.json"
 
@@ -67,6 +71,20 @@ ensure_bridge_dir()
 # -----------------------------------------------------------------------------
 # Helper Functions
 # -----------------------------------------------------------------------------
+def _scan_bridge_dir():
+    """
+    List regular files in BRIDGE_DIR with a single directory scan.
+    
+    Returns:
+        dict of file name -> os.DirEntry, or None if BRIDGE_DIR is missing
+    """
+    try:
+        with os.scandir(BRIDGE_DIR) as it:
+            return {entry.name: entry for entry in it if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
 def get_bridge_status() -> dict:
     """
     Get status of all bridge files.
@@ -77,20 +95,25 @@ def get_bridge_status() -> dict:
     files = {
         "snapshot": SNAPSHOT_PATH,
         "snapshot_meta": SNAPSHOT_META_PATH,
+        "snapshot_bundle": SNAPSHOT_BUNDLE_PATH,
         "actions": ACTIONS_PATH,
         "exec_report": EXEC_REPORT_PATH,
         "snapshot_request": SNAPSHOT_REQUEST_PATH,
     }
     
+    entries = _scan_bridge_dir()
+    
     status = {
         "bridge_dir": str(BRIDGE_DIR),
-        "bridge_exists": BRIDGE_DIR.exists(),
+        "bridge_exists": entries is not None,
         "files": {}
     }
+    entries = entries or {}
     
     for name, path in files.items():
-        if path.exists():
-            stat = path.stat()
+        entry = entries.get(path.name)
+        if entry is not None:
+            stat = entry.stat()
             status["files"][name] = {
                 "exists": True,
                 "path": str(path),
@@ -106,6 +129,24 @@ def get_bridge_status() -> dict:
     return status
 
 
+# [monotonic time, status] of the last get_bridge_status() call
+_status_cache = [0.0, None]
+
+
+def get_bridge_status_cached(ttl: float = 0.1) -> dict:
+    """
+    get_bridge_status(), reusing the previous result for ttl seconds.
+
+    Saves re-stat'ing every bridge file on back-to-back status checks.
+    """
+    now = time.monotonic()
+    if _status_cache[1] is not None and now - _status_cache[0] < ttl:
+        return _status_cache[1]
+    status = get_bridge_status()
+    _status_cache[:] = [now, status]
+    return status
+
+
 def clear_bridge_files():
     """
     Clear all bridge files (useful for testing/reset).
@@ -115,16 +156,19 @@ def clear_bridge_files():
     files = [
         SNAPSHOT_PATH,
         SNAPSHOT_META_PATH,
+        SNAPSHOT_BUNDLE_PATH,
         ACTIONS_PATH,
         EXEC_REPORT_PATH,
         SNAPSHOT_REQUEST_PATH,
     ]
     
+    entries = _scan_bridge_dir() or {}
     removed = []
     errors = []
+    _status_cache[1] = None
     
     for path in files:
-        if path.exists():
+        if path.name in entries:
             try:
                 path.unlink()
                 removed.append(str(path))
@@ -144,10 +188,12 @@ __all__ = [
     "BRIDGE_DIR",
     "SNAPSHOT_PATH",
     "SNAPSHOT_META_PATH",
+    "SNAPSHOT_BUNDLE_PATH",
     "ACTIONS_PATH",
     "EXEC_REPORT_PATH",
     "SNAPSHOT_REQUEST_PATH",
     "ensure_bridge_dir",
     "get_bridge_status",
+    "get_bridge_status_cached",
     "clear_bridge_files",
 ]
@@ -0,0 +1,25 @@
+"""
+Bridge payload codec (backend side).
+
+The implementation lives in fusion_addin/fusion_executor/bridge_codec.py
+(see fusion_shared); edit that file, not this one.
+"""
+from .fusion_shared import load_shared
+
+_codec = load_shared("bridge_codec")
+
+USE_MSGPACK = _codec.USE_MSGPACK
+dumps = _codec.dumps
+dumps_compact = _codec.dumps_compact
+loads = _codec.loads
+read = _codec.read
+write = _codec.write
+
+__all__ = [
+    "USE_MSGPACK",
+    "dumps",
+    "dumps_compact",
+    "loads",
+    "read",
+    "write",
+]
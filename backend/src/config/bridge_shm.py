@@ -0,0 +1,148 @@
+"""
+Shared-memory snapshot channel.
+
+Lets the snapshot writer and the backend share one mapped region instead of
+the write -> read -> parse cycle on SNAPSHOT_PATH.
+
+Layout: [seq:u32][len:u32][payload...], payload encoded with bridge_codec.
+The writer makes seq odd while the payload is being copied and even once it
+is complete (a seqlock), so readers never decode a torn snapshot.
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Optional, Tuple
+
+from . import bridge_codec
+
+SNAPSHOT_SHM_NAME = "electrify_snapshot"
+SNAPSHOT_SHM_SIZE = 1 << 20
+
+# How long read() retries while a write is in progress
+READ_TIMEOUT_S = 0.05
+
+_HEADER = struct.Struct("<II")
+
+# Segments created (and so tracked) by this process
+_created = set()
+
+
+def _untrack(shm: shared_memory.SharedMemory) -> None:
+    """Stop the resource tracker from unlinking a segment this process only attached to."""
+    if shm.name in _created:
+        return  # Our own segment: its single tracker entry must stay for unlink()
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SharedSnapshot:
+    """Single-writer, multi-reader snapshot slot in shared memory."""
+
+    def __init__(self, name: str = SNAPSHOT_SHM_NAME, size: int = SNAPSHOT_SHM_SIZE, create: bool = False):
+        """
+        Create or attach to the shared snapshot segment.
+
+        Args:
+            name: Shared memory segment name
+            size: Segment size in bytes (header included); used when creating
+            create: Create the segment (writer) instead of attaching (reader)
+
+        Raises:
+            FileNotFoundError: If attaching and the segment does not exist
+        """
+        if create:
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                _created.add(self._shm.name)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            _untrack(self._shm)
+        self._buf = self._shm.buf
+
+    @property
+    def capacity(self) -> int:
+        """Maximum payload size in bytes."""
+        return self._shm.size - _HEADER.size
+
+    @property
+    def seq(self) -> int:
+        return _HEADER.unpack_from(self._buf, 0)[0]
+
+    def write(self, obj: Any) -> int:
+        """
+        Publish a snapshot.
+
+        Returns:
+            New sequence number
+
+        Raises:
+            ValueError: If the encoded snapshot does not fit in the segment
+        """
+        payload = bridge_codec.dumps(obj)
+        if len(payload) > self.capacity:
+            raise ValueError(f"Snapshot is {len(payload)} bytes; shared segment holds {self.capacity}")
+
+        seq = self.seq
+        if seq % 2:
+            seq += 1  # Recover from a writer that died mid-update
+        struct.pack_into("<I", self._buf, 0, seq + 1)  # odd: write in progress
+        self._buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(self._buf, 0, seq + 2, len(payload))  # even: complete
+        return seq + 2
+
+    def read(self, last_seq: Optional[int] = None, timeout: float = READ_TIMEOUT_S) -> Optional[Tuple[int, Any]]:
+        """
+        Read the current snapshot.
+
+        Args:
+            last_seq: Sequence number already seen; returns None if unchanged
+            timeout: Seconds to retry while a write is in progress. A writer
+                that died mid-update leaves seq odd for good, so readers give
+                up rather than spin
+
+        Returns:
+            (seq, snapshot), or None if nothing new has been written or no
+            complete snapshot could be read within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            seq, length = _HEADER.unpack_from(self._buf, 0)
+            if seq == 0 or seq == last_seq:
+                return None
+            if seq % 2 == 0 and length <= self.capacity:
+                data = self._buf[_HEADER.size:_HEADER.size + length].tobytes()
+                if _HEADER.unpack_from(self._buf, 0)[0] == seq:
+                    return seq, bridge_codec.loads(data)
+            if time.monotonic() >= deadline:
+                return None  # Writer in progress for too long (or dead)
+
+    def wait(self, last_seq: Optional[int] = None, timeout: float = 5.0, poll_s: float = 0.001) -> Optional[Tuple[int, Any]]:
+        """Spin until the sequence number moves past last_seq, or timeout (returns None)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.read(last_seq)
+            if result is not None or time.monotonic() >= deadline:
+                return result
+            time.sleep(poll_s)
+
+    def close(self) -> None:
+        """Detach from the segment."""
+        self._buf.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the segment (writer side, on shutdown)."""
+        self._shm.unlink()
+        _created.discard(self._shm.name)
+
+
+__all__ = [
+    "SNAPSHOT_SHM_NAME",
+    "SNAPSHOT_SHM_SIZE",
+    "SharedSnapshot",
+]
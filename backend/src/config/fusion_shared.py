@@ -0,0 +1,40 @@
+"""
+Access to bridge modules shared with the Fusion add-in.
+
+The bridge codec lives in fusion_addin/fusion_executor/,
+which ships inside the Fusion add-in and cannot import from the backend.
+The backend loads those files directly so both sides run the same code.
+
+fusion_executor/__init__.py is deliberately not executed: it imports the
+action runner, which the backend has no use for.
+"""
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+
+from .bridge import PROJECT_ROOT
+
+FUSION_EXECUTOR_DIR = PROJECT_ROOT / "fusion_addin" / "fusion_executor"
+
+_PACKAGE = "_electrify_fusion_executor"
+
+
+def load_shared(name: str) -> ModuleType:
+    """
+    Import fusion_addin/fusion_executor/<name>.py.
+
+    Relative imports inside the module (e.g. ``from . import bridge_codec``)
+    resolve to the same shared modules.
+    """
+    if _PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            _PACKAGE,
+            FUSION_EXECUTOR_DIR / "__init__.py",
+            submodule_search_locations=[str(FUSION_EXECUTOR_DIR)],
+        )
+        sys.modules[_PACKAGE] = importlib.util.module_from_spec(spec)
+    return importlib.import_module(f"{_PACKAGE}.{name}")
+
+
+__all__ = ["FUSION_EXECUTOR_DIR", "load_shared"]
@@ -0,0 +1,144 @@
+"""
+Specialized JSON writers for fixed-shape bridge payloads.
+
+Snapshot components and nets always have the same fields, so they are
+formatted from precomputed templates instead of going through a generic
+encoder's per-value type dispatch. Items with any other shape are encoded
+with bridge_codec's compact JSON encoder, so output is always valid JSON
+and readable by bridge_codec.loads.
+"""
+import json
+import math
+import os
+import re
+import time
+
+from .bridge_codec import dumps_compact
+
+# Characters that must be escaped inside a JSON string
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+
+_COMP_KEYS = frozenset({"refdes", "part", "value", "x", "y", "rotation"})
+_COMP_TMPL = (
+    '{{"refdes":{refdes},"part":{part},"value":{value},'
+    '"x":{x},"y":{y},"rotation":{rotation}}}'
+)
+
+_NET_KEYS = frozenset({"name", "pins"})
+_NET_TMPL = '{{"name":{name},"pins":[{pins}]}}'
+
+
+def _str(value) -> str:
+    """
+    JSON literal for a string field, escaped only when needed.
+
+    Anything that is not a str (e.g. None) goes through the generic encoder.
+    """
+    if type(value) is not str:
+        return dumps_compact(value).decode("utf-8")
+    if _NEEDS_ESCAPE.search(value) is None:
+        return f'"{value}"'
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _num(comp: dict, key: str) -> str:
+    """
+    JSON literal for a component coordinate, written as json.dumps would.
+
+    NaN/inf have no JSON representation and are rejected.
+    """
+    value = comp[key]
+    if type(value) is int:
+        return str(value)
+    if type(value) is not float:
+        return dumps_compact(value).decode("utf-8")
+    if not math.isfinite(value):
+        raise ValueError(f"{comp.get('refdes')}: non-finite {key} ({value})")
+    return repr(value)
+
+
+def encode_component(comp: dict) -> bytes:
+    """
+    Encode a snapshot component ({refdes, part, value, x, y, rotation}).
+
+    Raises:
+        ValueError: If x, y or rotation is NaN or infinite
+    """
+    if comp.keys() != _COMP_KEYS:
+        return dumps_compact(comp)
+    return _COMP_TMPL.format(
+        refdes=_str(comp["refdes"]),
+        part=_str(comp["part"]),
+        value=_str(comp["value"]),
+        x=_num(comp, "x"),
+        y=_num(comp, "y"),
+        rotation=_num(comp, "rotation"),
+    ).encode("utf-8")
+
+
+def encode_net(net: dict) -> bytes:
+    """Encode a snapshot net ({name, pins: [str, ...]})."""
+    if net.keys() != _NET_KEYS:
+        return dumps_compact(net)
+    pins = ",".join(_str(pin) for pin in net["pins"])
+    return _NET_TMPL.format(name=_str(net["name"]), pins=pins).encode("utf-8")
+
+
+def write_array(fp, items, encode=dumps_compact) -> None:
+    """
+    Write a JSON array to a binary file object one element at a time.
+
+    items may be any iterable (e.g. a generator over the schematic); only
+    one encoded element is held in memory at once.
+    """
+    fp.write(b"[")
+    sep = b""
+    for item in items:
+        fp.write(sep)
+        fp.write(encode(item))
+        sep = b","
+    fp.write(b"]")
+
+
+def write_snapshot(fp, components, nets) -> None:
+    """Write {"components": [...], "nets": [...]} to a binary file object."""
+    fp.write(b'{"components":')
+    write_array(fp, components, encode_component)
+    fp.write(b',"nets":')
+    write_array(fp, nets, encode_net)
+    fp.write(b"}")
+
+
+def write_snapshot_bundle(path, components, nets, meta=None) -> None:
+    """
+    Write a snapshot bundle ({"snapshot": {...}, "meta": ...}) atomically.
+
+    Args:
+        path: Destination file (e.g. SNAPSHOT_BUNDLE_PATH)
+        components: Iterable of component dicts
+        nets: Iterable of net dicts
+        meta: Optional metadata dict; timestamp_unix_ms is stamped with
+            the write time when missing, so readers can age the bundle
+    """
+    if meta is not None and "timestamp_unix_ms" not in meta:
+        meta = {**meta, "timestamp_unix_ms": time.time_ns() // 1_000_000}
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(b'{"snapshot":')
+        write_snapshot(fp, components, nets)
+        fp.write(b',"meta":')
+        fp.write(dumps_compact(meta))
+        fp.write(b"}")
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+
+
+__all__ = [
+    "encode_component",
+    "encode_net",
+    "write_array",
+    "write_snapshot",
+    "write_snapshot_bundle",
+]
@@ -5,11 +5,12 @@ Computes component placements for schematic layout using a grid-based approach.
 Ensures no overlaps and provides deterministic results.
 """
 
+import functools
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Rect:
     """Rectangle representing occupied space on schematic."""
     x: float
@@ -36,7 +37,7 @@ class Placement:
     layer: str = "Top"
 
 
-@dataclass
+@dataclass(slots=True)
 class PartToPlace:
     """Part that needs placement."""
     refdes: str
@@ -79,10 +80,14 @@ class GridPlacer:
         self.sheet_max_x = sheet_max_x
         self.wrap_y_step = wrap_y_step
     
-    def estimate_size_cells(self, part_id: str, kind: str) -> tuple[int, int]:
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def estimate_size_cells(part_id: str, kind: str) -> tuple[int, int]:
         """
         Estimate component size in grid cells.
         
+        Memoized on (part_id, kind): schematics repeat a handful of kinds many times.
+        
         Args:
             part_id: Catalog part ID
             kind: Component kind (resistor, ic, connector, etc.)
@@ -116,39 +121,28 @@ class GridPlacer:
         Returns:
             List of occupied rectangles
         """
-        occupied = []
+        comps = (snapshot or {}).get('components') or ()
         
-        if not snapshot or 'components' not in snapshot:
-            return occupied
+        # Unplaced components have no x/y
+        return [
+            self._component_rect(comp)
+            for comp in comps
+            if comp.get('x') is not None and comp.get('y') is not None
+        ]
+    
+    def _component_rect(self, comp: dict) -> Rect:
+        """Occupied rectangle of a placed snapshot component, with margin around it."""
+        width = comp.get('width')
+        height = comp.get('height')
         
-        for comp in snapshot.get('components', []):
-            x = comp.get('x')
-            y = comp.get('y')
-            
-            if x is None or y is None:
-                continue
-            
-            # Get size from snapshot if available, otherwise estimate
-            width = comp.get('width')
-            height = comp.get('height')
-            
-            if width is None or height is None:
-                # Estimate based on kind and part_id
-                part_id = comp.get('part_id', '')
-                kind = comp.get('kind', 'unknown')
-                w_cells, h_cells = self.estimate_size_cells(part_id, kind)
-                width = w_cells * self.grid_step
-                height = h_cells * self.grid_step
-            
-            # Add margin
-            occupied.append(Rect(
-                x=x - self.margin,
-                y=y - self.margin,
-                w=width + 2 * self.margin,
-                h=height + 2 * self.margin
-            ))
+        if width is None or height is None:
+            # Estimate based on kind and part_id
+            w_cells, h_cells = self.estimate_size_cells(comp.get('part_id', ''), comp.get('kind', 'unknown'))
+            width = w_cells * self.grid_step
+            height = h_cells * self.grid_step
         
-        return occupied
+        margin = self.margin
+        return Rect(x=comp['x'] - margin, y=comp['y'] - margin, w=width + 2 * margin, h=height + 2 * margin)
     
     def snap_to_grid(self, x: float, y: float) -> tuple[float, float]:
         """Snap coordinates to grid."""
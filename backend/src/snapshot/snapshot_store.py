@@ -10,7 +10,9 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field, ConfigDict
 
-from backend.src.config.bridge import SNAPSHOT_PATH, SNAPSHOT_META_PATH
+from backend.src.config.bridge import SNAPSHOT_PATH, SNAPSHOT_META_PATH, SNAPSHOT_BUNDLE_PATH
+from backend.src.config import bridge_codec
+from backend.src.config.bridge_shm import SharedSnapshot
 
 
 class SnapshotDoc(BaseModel):
@@ -38,7 +40,9 @@ class SnapshotStore:
     Manages snapshot loading and caching.
     
     Features:
-    - Reads snapshot.json and snapshot.meta.json from bridge folder
+    - Reads the {snapshot, meta} bundle from shared memory or snapshot.bundle.json
+    - Falls back to snapshot.json and snapshot.meta.json (ULP export) when
+      there is no bundle or the export is newer
     - Caches snapshot in memory with timestamp
     - Returns empty snapshot if files missing or invalid
     - Provides age/staleness information
@@ -73,9 +77,14 @@ class SnapshotStore:
         if not force_reload and self._is_cache_valid():
             return self._cached_snapshot, self._warnings
         
-        # Load from disk
-        snapshot = self._load_snapshot_file()
-        meta = self._load_meta_file()
+        # Prefer a current combined bundle (one read); else the separate ULP files
+        bundle = self._load_bundle()
+        if bundle is not None:
+            snapshot = self._parse_snapshot(bundle.get('snapshot') or {})
+            meta = self._parse_meta(bundle['meta']) if bundle.get('meta') else None
+        else:
+            snapshot = self._load_snapshot_file()
+            meta = self._load_meta_file()
         
         # Cache the results
         self._cached_snapshot = snapshot
@@ -92,17 +101,56 @@ class SnapshotStore:
         age = datetime.now() - self._cache_time
         return age < self.cache_ttl
     
-    def _load_snapshot_file(self) -> SnapshotDoc:
-        """Load snapshot.json file."""
+    def _read_shared_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Read the shared-memory snapshot bundle, if a writer has published one."""
+        try:
+            shm = SharedSnapshot()
+        except FileNotFoundError:
+            return None
+        
+        try:
+            result = shm.read()
+        finally:
+            shm.close()
+        
+        return result[1] if result else None
+    
+    def _load_bundle(self) -> Optional[Dict[str, Any]]:
+        """
+        Load the {snapshot, meta} bundle from shared memory or snapshot.bundle.json.
+        
+        Returns None when no bundle exists or when the ULP export
+        (snapshot.json) was written after it, so a newer export always wins.
+        A shared-memory bundle without meta.timestamp_unix_ms has no other
+        age to go by and is treated as older than any export.
+        """
+        try:
+            bundle = self._read_shared_snapshot()
+            bundle_ms = None
+            if bundle is None and SNAPSHOT_BUNDLE_PATH.exists():
+                bundle = bridge_codec.read(SNAPSHOT_BUNDLE_PATH)
+                bundle_ms = SNAPSHOT_BUNDLE_PATH.stat().st_mtime_ns // 1_000_000
+        except Exception as e:
+            self._warnings.append(f"Error reading snapshot bundle: {e}")
+            return None
+        
+        if bundle is None:
+            return None
+        
+        # Prefer the bundle's own export time; fall back to the file's mtime
+        # (an undated shared-memory bundle counts as epoch 0)
+        meta = bundle.get('meta') or {}
+        bundle_ms = meta.get('timestamp_unix_ms', bundle_ms) or 0
+        try:
+            export_ms = SNAPSHOT_PATH.stat().st_mtime_ns // 1_000_000
+        except OSError:
+            return bundle
+        
+        return bundle if bundle_ms >= export_ms else None
+    
+    def _parse_snapshot(self, data: Dict[str, Any]) -> SnapshotDoc:
+        """Validate snapshot data."""
         try:
-            if not SNAPSHOT_PATH.exists():
-                self._warnings.append("Snapshot file not found - using empty snapshot")
-                return SnapshotDoc()
-            
-            with open(SNAPSHOT_PATH, 'r') as f:
-                data = json.load(f)
-            
-            # Validate and parse
             snapshot = SnapshotDoc(**data)
             
             # Check if empty
@@ -111,12 +159,42 @@ class SnapshotStore:
             
             return snapshot
             
+        except Exception as e:
+            self._warnings.append(f"Error reading snapshot: {e}")
+            return SnapshotDoc()
+    
+    def _parse_meta(self, data: Dict[str, Any]) -> Optional[SnapshotMeta]:
+        """Validate snapshot metadata."""
+        try:
+            meta = SnapshotMeta(**data)
+            
+            # Check for export errors
+            if not meta.success:
+                self._warnings.append(f"Snapshot export had errors: {meta.errors}")
+            
+            return meta
+            
+        except Exception as e:
+            self._warnings.append(f"Error reading metadata: {e}")
+            return None
+    
+    def _load_snapshot_file(self) -> SnapshotDoc:
+        """Load snapshot.json file."""
+        try:
+            if not SNAPSHOT_PATH.exists():
+                self._warnings.append("Snapshot file not found - using empty snapshot")
+                return SnapshotDoc()
+            
+            data = bridge_codec.read(SNAPSHOT_PATH)
+            
         except json.JSONDecodeError as e:
             self._warnings.append(f"Invalid JSON in snapshot file: {e}")
             return SnapshotDoc()
         except Exception as e:
             self._warnings.append(f"Error reading snapshot: {e}")
             return SnapshotDoc()
+        
+        return self._parse_snapshot(data)
     
     def _load_meta_file(self) -> Optional[SnapshotMeta]:
         """Load snapshot.meta.json file."""
@@ -125,20 +203,13 @@ class SnapshotStore:
                 self._warnings.append("Snapshot metadata not found")
                 return None
             
-            with open(SNAPSHOT_META_PATH, 'r') as f:
-                data = json.load(f)
-            
-            meta = SnapshotMeta(**data)
-            
-            # Check for export errors
-            if not meta.success:
-                self._warnings.append(f"Snapshot export had errors: {meta.errors}")
-            
-            return meta
+            data = bridge_codec.read(SNAPSHOT_META_PATH)
             
         except Exception as e:
             self._warnings.append(f"Error reading metadata: {e}")
             return None
+        
+        return self._parse_meta(data)
     
     def get_snapshot_age(self) -> Optional[timedelta]:
         """
@@ -0,0 +1,56 @@
+"""Tests for the bridge payload codec."""
+
+import codecs
+import json
+
+import pytest
+
+from backend.src.config import bridge_codec
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+needs_msgpack = pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+
+PAYLOAD = {"actions": [{"type": "move", "refdes": "R1", "x": 1.5}], "ok": True}
+
+
+def test_defaults_to_json():
+    """Without ELECTRIFY_BRIDGE_MSGPACK the bridge files stay plain JSON."""
+    assert bridge_codec.USE_MSGPACK is False
+    assert json.loads(bridge_codec.dumps(PAYLOAD)) == PAYLOAD
+
+
+def test_loads_sniffs_json():
+    assert bridge_codec.loads(json.dumps(PAYLOAD).encode()) == PAYLOAD
+    assert bridge_codec.loads(b"  \n[1, 2]") == [1, 2]
+
+
+@needs_msgpack
+def test_loads_sniffs_msgpack():
+    assert bridge_codec.loads(msgpack.packb(PAYLOAD, use_bin_type=True)) == PAYLOAD
+
+
+def test_loads_strips_utf8_bom():
+    """The ULP exporter may prefix the snapshot with a BOM."""
+    assert bridge_codec.loads(codecs.BOM_UTF8 + b'{"nets": []}') == {"nets": []}
+
+
+@needs_msgpack
+def test_msgpack_opt_in(monkeypatch, tmp_path):
+    monkeypatch.setattr(bridge_codec._codec, "USE_MSGPACK", True)
+    path = tmp_path / "actions.json"
+
+    assert bridge_codec.write(path, PAYLOAD)
+    assert not bridge_codec._codec._is_json(path.read_bytes())
+    assert bridge_codec.read(path) == PAYLOAD
+
+
+def test_write_skips_unchanged_payload(tmp_path):
+    path = tmp_path / "exec_report.json"
+    assert bridge_codec.write(path, PAYLOAD) is True
+    assert bridge_codec.write(path, PAYLOAD) is False
+    assert bridge_codec.write(path, {"ok": False}) is True
+    assert bridge_codec.read(path) == {"ok": False}
@@ -0,0 +1,60 @@
+"""Tests for the shared-memory snapshot channel."""
+
+import struct
+import time
+import uuid
+
+import pytest
+
+from backend.src.config.bridge_shm import SharedSnapshot
+
+
+@pytest.fixture
+def segment():
+    shm = SharedSnapshot(name=f"electrify_test_{uuid.uuid4().hex[:8]}", size=4096, create=True)
+    yield shm
+    shm.close()
+    shm.unlink()
+
+
+def test_read_empty_segment(segment):
+    """Nothing published yet."""
+    assert segment.read() is None
+
+
+def test_write_then_read(segment):
+    """A reader attached by name sees the published snapshot."""
+    seq = segment.write({"components": [{"refdes": "R1"}], "nets": []})
+    assert seq % 2 == 0
+
+    reader = SharedSnapshot(name=segment._shm.name)
+    try:
+        assert reader.read() == (seq, {"components": [{"refdes": "R1"}], "nets": []})
+        assert reader.read(last_seq=seq) is None  # Unchanged since last read
+    finally:
+        reader.close()
+
+
+def test_read_gives_up_on_dead_writer(segment):
+    """A writer that died mid-update leaves seq odd; read() must not spin forever."""
+    seq = segment.write({"components": []})
+    struct.pack_into("<I", segment._buf, 0, seq + 1)
+
+    start = time.monotonic()
+    assert segment.read(timeout=0.01) is None
+    assert time.monotonic() - start < 1.0
+
+
+def test_write_recovers_from_dead_writer(segment):
+    """The next write completes the sequence a dead writer left odd."""
+    seq = segment.write({"n": 1})
+    struct.pack_into("<I", segment._buf, 0, seq + 1)
+
+    new_seq = segment.write({"n": 2})
+    assert new_seq % 2 == 0
+    assert segment.read() == (new_seq, {"n": 2})
+
+
+def test_write_too_large(segment):
+    with pytest.raises(ValueError):
+        segment.write({"blob": "x" * 8192})
@@ -0,0 +1,57 @@
+"""Tests for the fixed-shape snapshot writers."""
+
+import io
+
+import pytest
+
+from backend.src.config import bridge_codec, schema_codecs
+
+COMPONENT = {"refdes": "R1", "part": "R-0603", "value": '10k "x"', "x": 1, "y": 2.5, "rotation": 90}
+NET = {"name": "GND", "pins": ["R1.1", "C1.2"]}
+
+
+def test_write_array_streams_generator():
+    fp = io.BytesIO()
+    schema_codecs.write_array(fp, ({"i": i} for i in range(3)))
+    assert bridge_codec.loads(fp.getvalue()) == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+    fp = io.BytesIO()
+    schema_codecs.write_array(fp, iter(()))
+    assert fp.getvalue() == b"[]"
+
+
+def test_write_snapshot_bundle_round_trip(tmp_path):
+    path = tmp_path / "snapshot.bundle.json"
+    odd = {"refdes": "U1", "extra": True}  # Not the template shape
+    schema_codecs.write_snapshot_bundle(path, [COMPONENT, odd], [NET], meta={"success": True})
+
+    bundle = bridge_codec.read(path)
+    assert bundle["meta"]["success"] is True
+    assert isinstance(bundle["meta"]["timestamp_unix_ms"], int)  # Stamped on write
+    assert bundle["snapshot"]["nets"] == [NET]
+    assert bundle["snapshot"]["components"][1] == odd
+    assert bundle["snapshot"]["components"][0]["value"] == '10k "x"'
+    assert bundle["snapshot"]["components"][0]["x"] == 1.0
+
+
+@pytest.mark.parametrize("comp", [
+    COMPONENT,
+    {**COMPONENT, "value": None, "part": None},  # null, not "None"
+    {**COMPONENT, "x": 10, "y": -3, "rotation": 0},  # ints stay ints
+    {**COMPONENT, "refdes": "R\u00e9\n1", "x": 0.1},
+])
+def test_encode_component_matches_json_dumps(comp):
+    decoded = bridge_codec.loads(schema_codecs.encode_component(comp))
+    assert decoded == comp
+    assert [type(decoded[k]) for k in comp] == [type(v) for v in comp.values()]
+
+
+def test_encode_net_non_str_name():
+    assert bridge_codec.loads(schema_codecs.encode_net({"name": None, "pins": []})) == {"name": None, "pins": []}
+
+
+@pytest.mark.parametrize("bad", [float("nan"), float("inf"), float("-inf")])
+def test_encode_component_rejects_non_finite(bad):
+    """The template would emit bare nan/inf tokens, which are not JSON."""
+    with pytest.raises(ValueError):
+        schema_codecs.encode_component({**COMPONENT, "x": bad})
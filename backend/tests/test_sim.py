@@ -0,0 +1,33 @@
+"""Tests for fixed-value parsing in compute_rc_values."""
+
+import math
+
+import pytest
+
+from backend.tools.sim import compute_rc_values
+
+FC = 1.0 / (2.0 * math.pi)  # R * C == 1
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("100n", 100e-9), ("100N", 100e-9), ("100nF", 100e-9),
+    ("10u", 10e-6), ("10U", 10e-6),
+    ("22p", 22e-12), ("22P", 22e-12),
+    ("20k", 20e3), ("20K", 20e3),
+    ("5m", 5e-3), ("2g", 2e9), ("2G", 2e9),
+])
+def test_unit_suffixes_are_case_insensitive(value, expected):
+    R_ohm, _ = compute_rc_values(FC, "R", value)
+    assert R_ohm == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["1M", "1MEG", "1meg", "1Meg"])
+def test_mega_suffix(value):
+    """A bare upper-case 'M' and MEG in any case are mega; lower-case 'm' is milli."""
+    R_ohm, _ = compute_rc_values(FC, "R", value)
+    assert R_ohm == pytest.approx(1e6)
+
+
+def test_unknown_unit():
+    with pytest.raises(ValueError):
+        compute_rc_values(FC, "R", "10x")
@@ -0,0 +1,87 @@
+"""Tests for snapshot bundle vs ULP export precedence in SnapshotStore."""
+
+import json
+import os
+import time
+
+import pytest
+
+from backend.src.snapshot import snapshot_store
+from backend.src.snapshot.snapshot_store import SnapshotStore
+
+
+def _meta(unix_ms):
+    return {"timestamp": "2026-01-01T00:00:00", "timestamp_unix_ms": unix_ms, "success": True}
+
+
+@pytest.fixture
+def bridge(tmp_path, monkeypatch):
+    paths = {
+        "SNAPSHOT_PATH": tmp_path / "snapshot.json",
+        "SNAPSHOT_META_PATH": tmp_path / "snapshot.meta.json",
+        "SNAPSHOT_BUNDLE_PATH": tmp_path / "snapshot.bundle.json",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(snapshot_store, name, path)
+    monkeypatch.setattr(SnapshotStore, "_read_shared_snapshot", lambda self: None)
+    return paths
+
+
+def _write_export(paths, refdes, mtime_s):
+    paths["SNAPSHOT_PATH"].write_text(json.dumps({"components": [{"refdes": refdes}], "nets": []}))
+    paths["SNAPSHOT_META_PATH"].write_text(json.dumps(_meta(int(mtime_s * 1000))))
+    os.utime(paths["SNAPSHOT_PATH"], (mtime_s, mtime_s))
+
+
+def _write_bundle(paths, refdes, unix_ms):
+    snapshot = {"components": [{"refdes": refdes}], "nets": []}
+    paths["SNAPSHOT_BUNDLE_PATH"].write_text(json.dumps({"snapshot": snapshot, "meta": _meta(unix_ms)}))
+
+
+def _refdes(store):
+    snapshot, _ = store.load_snapshot(force_reload=True)
+    return [c["refdes"] for c in snapshot.components]
+
+
+def test_bundle_newer_than_export_wins(bridge):
+    now = time.time()
+    _write_export(bridge, "ULP1", now - 60)
+    _write_bundle(bridge, "BUNDLE1", int(now * 1000))
+    assert _refdes(SnapshotStore()) == ["BUNDLE1"]
+
+
+def test_export_newer_than_bundle_wins(bridge):
+    """A stale bundle (e.g. left by the examples script) must not shadow a fresh export."""
+    now = time.time()
+    _write_bundle(bridge, "BUNDLE1", int((now - 60) * 1000))
+    _write_export(bridge, "ULP1", now)
+    assert _refdes(SnapshotStore()) == ["ULP1"]
+
+
+def test_bundle_without_export(bridge):
+    _write_bundle(bridge, "BUNDLE1", 0)
+    assert _refdes(SnapshotStore()) == ["BUNDLE1"]
+
+
+def test_shared_bundle_without_timestamp_loses_to_export(bridge, monkeypatch):
+    """Shared memory has no mtime; an undated bundle there must not hide later exports."""
+    _write_export(bridge, "ULP1", time.time())
+    shared = {"snapshot": {"components": [{"refdes": "SHM1"}], "nets": []}, "meta": {"version": "1.0"}}
+    monkeypatch.setattr(SnapshotStore, "_read_shared_snapshot", lambda self: shared)
+    assert _refdes(SnapshotStore()) == ["ULP1"]
+
+
+def test_dated_shared_bundle_beats_older_export(bridge, monkeypatch):
+    now = time.time()
+    _write_export(bridge, "ULP1", now - 60)
+    shared = {"snapshot": {"components": [{"refdes": "SHM1"}], "nets": []}, "meta": _meta(int(now * 1000))}
+    monkeypatch.setattr(SnapshotStore, "_read_shared_snapshot", lambda self: shared)
+    assert _refdes(SnapshotStore()) == ["SHM1"]
+
+
+def test_stale_shared_bundle_loses_to_export(bridge, monkeypatch):
+    now = time.time()
+    _write_export(bridge, "ULP1", now)
+    shared = {"snapshot": {"components": [{"refdes": "SHM1"}], "nets": []}, "meta": _meta(int((now - 60) * 1000))}
+    monkeypatch.setattr(SnapshotStore, "_read_shared_snapshot", lambda self: shared)
+    assert _refdes(SnapshotStore()) == ["ULP1"]
@@ -3,9 +3,12 @@ Legacy tools module - kept for backward compatibility.
 Core tools are now integrated in agent_runtime.py for better orchestration.
 """
 
-def list_supported_blocks() -> list[str]:
-    """Return circuit blocks that the agent can generate."""
-    return ["rc_lowpass", "rc_highpass", "voltage_divider"]
+_SUPPORTED_BLOCKS = ("rc_lowpass", "rc_highpass", "voltage_divider")
+
+
+def list_supported_blocks() -> tuple[str, ...]:
+    """Return circuit blocks that the agent can generate (shared, immutable)."""
+    return _SUPPORTED_BLOCKS
 
 
 def propose_rc_block(block_type: str, fc_hz: float, fixed_component: str, fixed_value: str) -> dict:
@@ -6,13 +6,58 @@ Provides ngspice AC sweep execution with math fallback and bode plot generation.
 import os
 import subprocess
 import tempfile
+import functools
 import math
+import mmap
+import shutil
+import threading
 from pathlib import Path
 from typing import Tuple
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Headless backend: no GUI state, safe from worker threads
 import matplotlib.pyplot as plt
 
 
+# Bode frequency grid: 1 Hz to 100 kHz (log scale). Independent of R/C, so built once.
+_BODE_FREQS = np.logspace(0, 5, 200)
+_BODE_FREQS.flags.writeable = False
+_BODE_W = 2 * np.pi * _BODE_FREQS
+
+# ngspice control block: AC sweep matching the analytic grid, written as a binary rawfile
+_AC_CONTROL_TEMPLATE = """.control
+set filetype=binary
+ac dec 20 1 100k
+write {raw_path} v(out)
+quit
+.endc"""
+
+# SI prefixes for component values, keyed by lower-cased suffix (SPICE suffixes
+# are case-insensitive). Mega is "MEG" in any case, or a bare upper-case 'M'.
+_UNIT_MULTIPLIERS = {
+    'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'm': 1e-3,
+    'k': 1e3, 'g': 1e9
+}
+
+# Bode figure is created once and redrawn per call; creating figures dominates plot time.
+_FIG = None
+_AX1 = None
+_AX2 = None
+_FIG_LOCK = threading.Lock()
+
+
+# Directories already created by this process; skips repeated makedirs syscalls
+_MKDIR_CACHE = set()
+
+
+def _ensure_dir(path: str) -> None:
+    """Create a directory (and parents) once per process."""
+    if path not in _MKDIR_CACHE:
+        os.makedirs(path, exist_ok=True)
+        _MKDIR_CACHE.add(path)
+
+
+@functools.lru_cache(maxsize=256)
 def compute_rc_values(fc_hz: float, fixed_component: str, fixed_value: str) -> Tuple[float, float]:
     """
     Calculate R and C values for an RC circuit given cutoff frequency.
@@ -25,38 +70,32 @@ def compute_rc_values(fc_hz: float, fixed_component: str, fixed_value: str) -> T
     Returns:
         (R_ohm, C_farad): Tuple of resistance and capacitance values
     
+    Results are memoized; the function is pure in its (hashable) arguments.
+    
     Raises:
         ValueError: If parameters are invalid
     """
     # Parse fixed_value (handle units: k, M, n, u, p, etc.)
-    multipliers = {
-        'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'm': 1e-3,
-        'k': 1e3, 'M': 1e6, 'G': 1e9
-    }
-    
-    value_str = str(fixed_value).strip().upper()
-    numeric_part = ""
-    unit_part = ""
-    
-    for i, char in enumerate(value_str):
-        if char.isdigit() or char == '.':
-            numeric_part += char
-        else:
-            unit_part = value_str[i:]
-            break
+    value_str = str(fixed_value).strip()
+    
+    # Split point between numeric part and unit suffix
+    i = 0
+    while i < len(value_str) and (value_str[i].isdigit() or value_str[i] == '.'):
+        i += 1
     
     try:
-        numeric_val = float(numeric_part)
+        numeric_val = float(value_str[:i])
     except ValueError:
         raise ValueError(f"Cannot parse numeric value from '{fixed_value}'")
     
-    # Apply multiplier
+    # Apply multiplier (only the first unit character matters, e.g. "nF" -> 'n')
     multiplier = 1.0
-    if unit_part:
-        unit_char = unit_part[0].lower()
-        if unit_char in multipliers:
-            multiplier = multipliers[unit_char]
-        else:
+    unit_char = value_str[i:i + 1]
+    if unit_char == 'M' or value_str[i:i + 3].lower() == 'meg':
+        multiplier = 1e6
+    elif unit_char:
+        multiplier = _UNIT_MULTIPLIERS.get(unit_char.lower())
+        if multiplier is None:
             raise ValueError(f"Unknown unit in '{fixed_value}'")
     
     fixed_value_base = numeric_val * multiplier
@@ -94,36 +133,38 @@ def run_ngspice_ac(netlist_text: str, workdir: str = None, R_ohm: float = None,
         (freqs, mag_db, phase_deg): Numpy arrays of frequency, magnitude in dB, phase in degrees
     """
     
-    if workdir is None:
+    # Only the rawfile touches disk; the netlist is piped to ngspice on stdin
+    owns_workdir = workdir is None
+    if owns_workdir:
         workdir = tempfile.mkdtemp(prefix="ngspice_")
+    else:
+        _ensure_dir(workdir)
     
-    os.makedirs(workdir, exist_ok=True)
-    
-    # Save netlist to file
-    netlist_path = os.path.join(workdir, "circuit.cir")
-    output_log = os.path.join(workdir, "output.log")
-    
-    with open(netlist_path, 'w') as f:
-        f.write(netlist_text)
+    raw_path = os.path.join(workdir, "circuit.raw")
     
     # Try to run ngspice
     try:
+        # SPICE decks are ASCII; results come from the rawfile, so console output is discarded
         result = subprocess.run(
-            ['ngspice', '-b', '-o', output_log, netlist_path],
-            capture_output=True,
-            text=True,
+            ['ngspice', '-b'],
+            input=_with_ac_control(netlist_text, raw_path).encode('ascii', errors='replace'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
             timeout=10
         )
         
-        if result.returncode == 0 and os.path.exists(output_log):
+        if result.returncode == 0 and os.path.exists(raw_path):
             # Attempt to parse output
-            freqs, mag_db, phase_deg = _parse_ngspice_output(output_log)
+            freqs, mag_db, phase_deg = _parse_ngspice_rawfile(raw_path)
             if freqs is not None:
                 return freqs, mag_db, phase_deg
     except (FileNotFoundError, subprocess.TimeoutExpired):
         pass
     except Exception as e:
         print(f"ngspice error: {e}")
+    finally:
+        if owns_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
     
     # Fallback: analytic RC transfer function
     print("ngspice unavailable or failed; using analytic RC transfer function")
@@ -135,56 +176,95 @@ def run_ngspice_ac(netlist_text: str, workdir: str = None, R_ohm: float = None,
     return _analytic_rc_bode(R_ohm, C_farad)
 
 
-def _parse_ngspice_output(log_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+def _with_ac_control(netlist_text: str, raw_path: str) -> str:
     """
-    Parse ngspice AC sweep output from log file.
-    Looks for frequency, magnitude, and phase columns.
+    Insert the AC sweep control block into a netlist, ahead of its .end card.
+    The block runs the sweep and writes v(out) to a binary rawfile at raw_path.
+    """
+    control = _AC_CONTROL_TEMPLATE.format(raw_path=raw_path)
+    
+    lines = netlist_text.rstrip().splitlines()
+    if lines and lines[-1].strip().lower() == '.end':
+        lines.insert(len(lines) - 1, control)
+    else:
+        lines.extend([control, '.end'])
+    
+    return '\n'.join(lines) + '\n'
+
+
+def _read_rawfile(raw_path: str) -> Tuple[list, np.ndarray]:
+    """
+    Read an ngspice binary rawfile.
     
     Returns:
-        (freqs, mag_db, phase_deg) or (None, None, None) if parsing fails
+        (names, data): Lowercased vector names and a (points, vars) array,
+        complex128 for AC analyses and float64 otherwise
+    
+    Raises:
+        ValueError: If the file is not a binary rawfile
     """
-    try:
-        with open(log_path, 'r') as f:
-            lines = f.readlines()
+    with open(raw_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        marker = mm.find(b'Binary:\n')
+        if marker < 0:
+            raise ValueError(f"Not a binary rawfile: {raw_path}")
         
-        # Look for data section (typically starts with Index or frequency header)
-        freqs = []
-        mag = []
-        phase = []
+        header = mm[:marker].decode('ascii', errors='replace').splitlines()
         
-        in_data = False
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Look for markers or data lines
-            if 'Index' in line or 'frequency' in line.lower():
-                in_data = True
-                continue
-            
-            if in_data:
+        nvars = npoints = 0
+        is_complex = False
+        names = []
+        in_vars = False
+        for line in header:
+            if in_vars:
+                # Variable lines: <index> <name> <type>
                 parts = line.split()
-                if len(parts) >= 3:
-                    try:
-                        # Assuming format: Index freq mag phase (or similar)
-                        freq = float(parts[1]) if len(parts) > 1 else None
-                        magnitude = float(parts[2]) if len(parts) > 2 else None
-                        phase_val = float(parts[3]) if len(parts) > 3 else None
-                        
-                        if freq and magnitude is not None:
-                            freqs.append(freq)
-                            mag.append(magnitude)
-                            if phase_val is not None:
-                                phase.append(phase_val)
-                    except (ValueError, IndexError):
-                        continue
+                if len(parts) >= 2 and parts[0].isdigit():
+                    names.append(parts[1].lower())
+                    continue
+                in_vars = False
+            
+            key, _, value = line.partition(':')
+            key = key.strip().lower()
+            if key == 'no. variables':
+                nvars = int(value)
+            elif key == 'no. points':
+                npoints = int(value)
+            elif key == 'flags':
+                is_complex = 'complex' in value.lower()
+            elif key == 'variables':
+                in_vars = True
+        
+        if nvars == 0 or len(names) != nvars:
+            raise ValueError(f"Malformed rawfile header: {raw_path}")
+        
+        dtype = np.complex128 if is_complex else np.float64
+        data = np.frombuffer(
+            mm, dtype=dtype, count=npoints * nvars, offset=marker + len(b'Binary:\n')
+        ).reshape(npoints, nvars).copy()
+    
+    return names, data
+
+
+def _parse_ngspice_rawfile(raw_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Parse ngspice AC sweep output from a binary rawfile.
+    
+    Returns:
+        (freqs, mag_db, phase_deg) or (None, None, None) if parsing fails
+    """
+    try:
+        names, data = _read_rawfile(raw_path)
+        if data.shape[0] == 0 or data.shape[1] < 2:
+            return None, None, None
+        
+        # First vector is the sweep variable; output is v(out) if present, else the last vector
+        out_idx = names.index('v(out)') if 'v(out)' in names else len(names) - 1
+        out = data[:, out_idx]
         
-        if freqs:
-            freqs = np.array(freqs)
-            mag_db = np.array(mag)
-            phase_deg = np.array(phase) if phase else np.zeros_like(mag_db)
-            return freqs, mag_db, phase_deg
+        freqs = data[:, 0].real
+        mag_db = 20 * np.log10(np.abs(out))
+        phase_deg = np.angle(out, deg=True)
+        return freqs, mag_db, phase_deg
     
     except Exception as e:
         print(f"Failed to parse ngspice output: {e}")
@@ -200,8 +280,6 @@ def _extract_rc_from_netlist(netlist_text: str, R_ohm: float = None, C_farad: fl
     Returns:
         (R_ohm, C_farad): Extracted or default values
     """
-    import re
-    
     # Default fallback values
     if R_ohm is None:
         R_ohm = 1000.0
@@ -209,17 +287,23 @@ def _extract_rc_from_netlist(netlist_text: str, R_ohm: float = None, C_farad: fl
         C_farad = 100e-9
     
     try:
-        lines = netlist_text.split('\n')
-        for line in lines:
-            # Look for resistor definition: R<name> <nodes> <value>
-            r_match = re.search(r'^\s*R\d*\s+\S+\s+\S+\s+([\d.eE+-]+)\s*$', line, re.IGNORECASE)
-            if r_match:
-                R_ohm = float(r_match.group(1))
+        for line in netlist_text.splitlines():
+            # Element lines: <name> <node1> <node2> <value>
+            parts = line.split()
+            if len(parts) < 4:
+                continue
             
-            # Look for capacitor definition: C<name> <nodes> <value>
-            c_match = re.search(r'^\s*C\d*\s+\S+\s+\S+\s+([\d.eE+-]+)\s*$', line, re.IGNORECASE)
-            if c_match:
-                C_farad = float(c_match.group(1))
+            tag = parts[0][:1].upper()
+            if tag == 'R':
+                try:
+                    R_ohm = float(parts[-1])
+                except ValueError:
+                    pass
+            elif tag == 'C':
+                try:
+                    C_farad = float(parts[-1])
+                except ValueError:
+                    pass
     except Exception as e:
         print(f"Could not extract RC values from netlist: {e}")
     
@@ -243,18 +327,15 @@ def _analytic_rc_bode(R_ohm: float = None, C_farad: float = None) -> Tuple[np.nd
     if C_farad is None:
         C_farad = 100e-9
     
-    # Frequency range: 1 Hz to 100 kHz (log scale)
-    freqs = np.logspace(0, 5, 200)  # 1 Hz to 100 kHz
-    
     # RC low-pass transfer function: H(jw) = 1 / (1 + j*w*R*C)
-    w = 2 * np.pi * freqs
-    H = 1.0 / (1.0 + 1j * w * R_ohm * C_farad)
+    # Closed form avoids complex intermediates:
+    #   |H| in dB = -10 * log10(1 + (wRC)^2),  angle(H) = -atan(wRC)
+    wrc = _BODE_W * (R_ohm * C_farad)
     
-    # Magnitude in dB and phase in degrees
-    mag_db = 20 * np.log10(np.abs(H))
-    phase_deg = np.angle(H, deg=True)
+    mag_db = -10 * np.log10(1.0 + wrc * wrc)
+    phase_deg = -np.degrees(np.arctan(wrc))
     
-    return freqs, mag_db, phase_deg
+    return _BODE_FREQS, mag_db, phase_deg
 
 
 def generate_bode_plot(freqs: np.ndarray, mag_db: np.ndarray, phase_deg: np.ndarray, out_path: str) -> str:
@@ -270,29 +351,36 @@ def generate_bode_plot(freqs: np.ndarray, mag_db: np.ndarray, phase_deg: np.ndar
     Returns:
         out_path: Path to saved PNG file
     """
+    global _FIG, _AX1, _AX2
+    
     # Ensure output directory exists
-    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
-    
-    # Create figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-    
-    # Magnitude plot
-    ax1.semilogx(freqs, mag_db, 'b-', linewidth=2)
-    ax1.set_xlabel('Frequency (Hz)')
-    ax1.set_ylabel('Magnitude (dB)')
-    ax1.set_title('Bode Plot - Magnitude')
-    ax1.grid(True, which='both', alpha=0.3)
-    
-    # Phase plot
-    ax2.semilogx(freqs, phase_deg, 'r-', linewidth=2)
-    ax2.set_xlabel('Frequency (Hz)')
-    ax2.set_ylabel('Phase (degrees)')
-    ax2.set_title('Bode Plot - Phase')
-    ax2.grid(True, which='both', alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    _ensure_dir(os.path.dirname(out_path) or '.')
+    
+    with _FIG_LOCK:
+        # Create figure with two subplots on first use, then reuse it
+        if _FIG is None:
+            _FIG, (_AX1, _AX2) = plt.subplots(2, 1, figsize=(10, 8))
+        else:
+            _AX1.clear()
+            _AX2.clear()
+        
+        # Magnitude plot
+        _AX1.semilogx(freqs, mag_db, 'b-', linewidth=2, rasterized=True)
+        _AX1.set_xlabel('Frequency (Hz)')
+        _AX1.set_ylabel('Magnitude (dB)')
+        _AX1.set_title('Bode Plot - Magnitude')
+        _AX1.grid(True, which='both', alpha=0.3)
+        
+        # Phase plot
+        _AX2.semilogx(freqs, phase_deg, 'r-', linewidth=2, rasterized=True)
+        _AX2.set_xlabel('Frequency (Hz)')
+        _AX2.set_ylabel('Phase (degrees)')
+        _AX2.set_title('Bode Plot - Phase')
+        _AX2.grid(True, which='both', alpha=0.3)
+        
+        # tight_layout already fits the axes; bbox_inches='tight' would add a second render pass
+        _FIG.tight_layout()
+        _FIG.savefig(out_path, dpi=100)
     
     return out_path
 
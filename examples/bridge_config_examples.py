@@ -4,8 +4,9 @@ Example: Using bridge configuration for backend-Fusion communication.
 This script demonstrates how to use the bridge configuration module
 to write/read files between backend and Fusion add-in.
 """
-import json
+import os
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -17,13 +18,15 @@ sys.path.insert(0, str(backend_path))
 from src.config.bridge import (
     BRIDGE_DIR,
     SNAPSHOT_PATH,
-    SNAPSHOT_META_PATH,
+    SNAPSHOT_BUNDLE_PATH,
     ACTIONS_PATH,
     EXEC_REPORT_PATH,
     SNAPSHOT_REQUEST_PATH,
-    get_bridge_status,
+    get_bridge_status_cached,
     clear_bridge_files
 )
+from src.config import bridge_codec, schema_codecs
+from src.config.bridge_shm import SharedSnapshot
 
 
 def example_backend_write_actions():
@@ -55,8 +58,7 @@ def example_backend_write_actions():
     }
     
     # Write actions
-    with open(ACTIONS_PATH, "w") as f:
-        json.dump(actions, f, indent=2)
+    bridge_codec.write(ACTIONS_PATH, actions)
     
     print(f"✓ Wrote {len(actions['actions'])} actions to:")
     print(f"  {ACTIONS_PATH}")
@@ -105,26 +107,50 @@ def example_fusion_write_snapshot():
         ]
     }
     
-    # Write snapshot
-    with open(SNAPSHOT_PATH, "w") as f:
-        json.dump(snapshot, f, indent=2)
-    
-    # Write metadata
     meta = {
         "timestamp": datetime.now().isoformat(),
+        "timestamp_unix_ms": time.time_ns() // 1_000_000,
+        "success": True,
         "version": "1.0",
         "component_count": len(snapshot["components"]),
         "net_count": len(snapshot["nets"])
     }
     
-    with open(SNAPSHOT_META_PATH, "w") as f:
-        json.dump(meta, f, indent=2)
+    # Snapshot and metadata travel together, so readers do a single read
+    bundle = {"snapshot": snapshot, "meta": meta}
+    
+    # Publish through shared memory (falls back to the atomic bundle file)
+    # A real writer keeps the segment alive; this example removes it at the end.
+    shm = None
+    try:
+        shm = SharedSnapshot(create=True)
+        seq = shm.write(bundle)
+        print(f"✓ Published snapshot bundle to shared memory (seq={seq})")
+    except (OSError, ValueError) as e:
+        print(f"Shared memory unavailable ({e}); streaming bundle file")
+        # Stream element by element through the fixed-shape snapshot
+        # encoders (a real writer would pass generators over Fusion's
+        # schematic instead of prebuilt lists)
+        schema_codecs.write_snapshot_bundle(
+            SNAPSHOT_BUNDLE_PATH,
+            iter(snapshot["components"]),
+            iter(snapshot["nets"]),
+            meta
+        )
+        print(f"✓ Wrote snapshot bundle with {len(snapshot['components'])} components to:")
+        print(f"  {SNAPSHOT_BUNDLE_PATH}")
     
-    print(f"✓ Wrote snapshot with {len(snapshot['components'])} components to:")
-    print(f"  {SNAPSHOT_PATH}")
-    print(f"✓ Wrote metadata to:")
-    print(f"  {SNAPSHOT_META_PATH}")
-    print(f"\nBackend can now read from: SNAPSHOT_PATH")
+    if shm is not None:
+        # Backend side: attach and read without touching disk
+        reader = SharedSnapshot()
+        seq, shared = reader.read()
+        reader.close()
+        print(f"✓ Backend read {len(shared['snapshot']['components'])} components from shared memory (seq={seq})")
+        
+        shm.close()
+        shm.unlink()
+    else:
+        print(f"\nBackend can now read from: SNAPSHOT_BUNDLE_PATH")
 
 
 def example_fusion_write_execution_report():
@@ -146,8 +172,7 @@ def example_fusion_write_execution_report():
         "execution_time_ms": 245
     }
     
-    with open(EXEC_REPORT_PATH, "w") as f:
-        json.dump(report, f, indent=2)
+    bridge_codec.write(EXEC_REPORT_PATH, report)
     
     print(f"✓ Wrote execution report to:")
     print(f"  {EXEC_REPORT_PATH}")
@@ -168,8 +193,7 @@ def example_backend_request_snapshot():
         "reason": "User asked for current state"
     }
     
-    with open(SNAPSHOT_REQUEST_PATH, "w") as f:
-        json.dump(request, f, indent=2)
+    bridge_codec.write(SNAPSHOT_REQUEST_PATH, request)
     
     print(f"✓ Wrote snapshot request to:")
     print(f"  {SNAPSHOT_REQUEST_PATH}")
@@ -185,7 +209,7 @@ def example_check_bridge_status():
     print("Example 5: Check Bridge Status")
     print("=" * 60)
     
-    status = get_bridge_status()
+    status = get_bridge_status_cached()
     
     print(f"Bridge Directory: {status['bridge_dir']}")
     print(f"Exists: {status['bridge_exists']}")
@@ -206,7 +230,7 @@ def example_cleanup():
     print("=" * 60)
     
     print("Current files:")
-    status = get_bridge_status()
+    status = get_bridge_status_cached()
     existing = [name for name, info in status['files'].items() if info['exists']]
     print(f"  {len(existing)} files exist")
     
@@ -220,7 +244,7 @@ def example_cleanup():
     if result['removed']:
         print("\nRemoved files:")
         for path in result['removed']:
-            print(f"  • {Path(path).name}")
+            print(f"  • {os.path.basename(path)}")
 
 
 if __name__ == "__main__":
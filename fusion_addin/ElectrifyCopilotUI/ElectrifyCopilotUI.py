@@ -6,21 +6,41 @@ import adsk.core
 import adsk.fusion
 import adsk.cam
 import traceback
+import collections
 import os
+import sys
+import re
+import time
 import json
 
-# Import history handlers module (routes history_* actions to HistoryService)
+# orjson is much faster for palette traffic but is not bundled with Fusion's Python
 try:
-    from . import history_handlers
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    _json_loads = orjson.loads
 except ImportError:
-    # Fallback for direct execution
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Import history handlers module (routes history_* actions to HistoryService)
+if __package__:
+    from . import history_handlers
+    from . import chat_history
+else:
+    # Direct execution
     import history_handlers
+    import chat_history
 
 # Global references
 app = None
 ui = None
 palette = None
-handlers = []
+# Event handlers by slot; Fusion does not keep them alive on its own.
+# Each slot holds one instance, reused across palettes and command runs.
+handlers = {}
 
 # Palette configuration
 PALETTE_ID = 'ElectrifyCopilotPalette'
@@ -28,23 +48,171 @@ PALETTE_NAME = 'Electrify Copilot'
 PALETTE_WIDTH = 400
 PALETTE_HEIGHT = 600
 
-def electron_run(command: str) -> str:
+# Resolved once at import; realpath stats every path component
+_ADD_IN_DIR = os.path.dirname(os.path.realpath(__file__))
+# Forward slashes for proper URL formatting
+_PALETTE_HTML_PATH = os.path.join(_ADD_IN_DIR, 'palette.html').replace('\\', '/')
+
+# Log levels for the buffered palette-traffic log (ELECTRIFY_LOG_LEVEL).
+# DEBUG logs every palette message verbatim, chat payloads included.
+DEBUG = 10
+INFO = 20
+_LOG_LEVELS = {'DEBUG': DEBUG, 'INFO': INFO}
+
+
+def _read_log_level(default=INFO):
+    """ELECTRIFY_LOG_LEVEL as a level name ('info', 'DEBUG') or number; default when unset or invalid."""
+    value = os.getenv('ELECTRIFY_LOG_LEVEL', '').strip()
+    if not value:
+        return default
+    level = _LOG_LEVELS.get(value.upper())
+    if level is not None:
+        return level
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+_LOG_LEVEL = _read_log_level()
+
+# Log full tracebacks (ELECTRIFY_VERBOSE=1) instead of one-line error summaries
+_VERBOSE = os.getenv('ELECTRIFY_VERBOSE', '0') == '1'
+
+
+def _exc_text():
+    """The exception being handled, as a traceback when verbose, else 'Type: message'."""
+    if _VERBOSE:
+        return traceback.format_exc()
+    exc = sys.exc_info()[1]
+    return f'{type(exc).__name__}: {exc}'
+
+
+class _LogBuffer:
+    """
+    Collects log lines and hands them to app.log in one call per flush.
+
+    Each app.log call crosses into Fusion, so palette event handling
+    appends here and flushes once when the event is done.
+    """
+    def __init__(self, max_pending=64):
+        self._pending = collections.deque()
+        self._max_pending = max_pending
+
+    def append(self, message):
+        self._pending.append(message)
+        if len(self._pending) >= self._max_pending:
+            self.flush()
+
+    def flush(self):
+        if self._pending and app:
+            app.log('\n'.join(self._pending))
+            self._pending.clear()
+
+
+_LOG = _LogBuffer()
+
+
+def _handler(slot, cls):
+    """Return the handler in slot, creating it on first use."""
+    handler = handlers.get(slot)
+    if handler is None:
+        handler = handlers[slot] = cls()
+    return handler
+
+_ELECTRON_PREFIX = 'Electron.run "'
+_ELECTRON_SUFFIX = '"'
+
+def electron_run(command: str, application=None) -> str:
     # Runs an Electronics (EAGLE-style) command inside Fusion
-    return app.executeTextCommand(f'Electron.run "{command}"')
+    # (every Electron.run call in the add-in goes through here)
+    return (application or app).executeTextCommand(_ELECTRON_PREFIX + command + _ELECTRON_SUFFIX)
 
 def test_add_resistor():
     # You must have an Electronics schematic open/active for this to work.
     # This device string may differ in your environment. See the note below.
     #electron_run("GRID mm 1")
     #electron_run("WINDOW FIT")
-    electron_run("ADD R (10 10)")
-    electron_run("ADD R (20 10)")
-    electron_run("ADD R (30 10)")
-    electron_run("ADD R (40 10)")
-    electron_run("ADD R (50 10)")
-    electron_run("ADD R (60 10)")
-    electron_run("ADD R (70 10)")
-    electron_run("ADD R (80 10)")
+    # One Electron.run call: the EAGLE command line takes ';'-separated commands
+    electron_run(' '.join(f'ADD R ({x} 10);' for x in range(10, 81, 10)))
+
+
+# show_component_info payload shape; copies share its key layout
+_INFO_TEMPLATE = {
+    'name': '',
+    'ref': '',
+    'value': '',
+    'footprint': '',
+    'datasheet': '',
+    'description': '',
+}
+
+
+def _component_info_json(description):
+    """Encoded show_component_info payload with empty fields and a status message."""
+    payload = _INFO_TEMPLATE.copy()
+    payload['description'] = description
+    return _json_dumps(payload)
+
+
+# Fixed show_component_info messages, encoded once
+_NOT_ELECTRONICS_JSON = _component_info_json('Switch to Electronics workspace to view component info.')
+_NO_SELECTION_JSON = _component_info_json('No component selected. Select a component in the schematic.')
+_INFO_ERROR_JSON = _component_info_json('Error gathering component info. See log.')
+
+
+# Entity attributes copied into component info (lowercase names)
+_WANTED_ATTRIBUTES = frozenset({'datasheet', 'description'})
+
+
+def _read_wanted_attributes(attrs):
+    """Collect wanted attribute values by lowercase name; the last match wins."""
+    found = {}
+    try:
+        for attr in attrs:
+            key = attr.name.lower()
+            if key in _WANTED_ATTRIBUTES:
+                found[key] = attr.value
+    except Exception:
+        pass
+    return found
+
+
+def _extract_entity_fields(entity):
+    """
+    Read component fields from a selected entity, with '' for anything missing.
+    Returns dict with: { name, ref, value, footprint, datasheet, description }
+    """
+    # getattr(None, ...) yields the default, so a missing entity gives empty fields
+    fields = _INFO_TEMPLATE.copy()
+    fields['name'] = getattr(entity, 'name', '')
+    fields['ref'] = getattr(entity, 'designator', '')
+    fields['value'] = getattr(entity, 'value', '')
+    fields['footprint'] = getattr(entity, 'footprint', '')
+    fields['datasheet'] = getattr(entity, 'datasheet', '')
+    # Attributes / custom properties override datasheet and fill description
+    attrs = getattr(entity, 'attributes', None)
+    if attrs:
+        fields.update(_read_wanted_attributes(attrs))
+    return fields
+
+
+def _current_selection(product_fallback=False):
+    """
+    The active selection, or None. Fusion API property reads can raise
+    (e.g. RuntimeError) rather than return nothing, so each read is guarded.
+    """
+    try:
+        sel = ui.activeSelectionSet
+    except Exception:
+        sel = None
+    if not sel and product_fallback:
+        try:
+            product = app.activeProduct
+            sel = product.selection if product else None
+        except Exception:
+            sel = None
+    return sel
 
 
 def describe_selected_component():
@@ -53,78 +221,32 @@ def describe_selected_component():
     send a composed payload to the palette to prefill the composer.
     """
     global app, ui, palette
+    log = _LOG.append
     try:
         # Try several ways to access the selection (best-effort, API varies)
-        sel = None
-        try:
-            sel = ui.activeSelectionSet
-        except Exception:
-            pass
-        
-        if not sel:
-            try:
-                sel = app.activeProduct.selection if app.activeProduct else None
-            except Exception:
-                pass
+        sel = _current_selection(product_fallback=True)
 
         if not sel:
-            app.log('[Copilot] No selection found')
+            log('[Copilot] No selection found')
             send_to_palette('copilot_reply', {'message': 'Please select a component in the schematic.'})
             return
 
         # The selection object may provide an entity property
-        entity = None
-        try:
-            entity = sel.entity
-        except Exception:
-            pass
-
-        # Gather common fields with fallbacks
-        name = ''
-        ref = ''
-        value = ''
-        footprint = ''
-        datasheet = ''
-
-        try:
-            name = entity.name if entity else ''
-        except Exception:
-            pass
-        try:
-            ref = entity.designator if entity else ''
-        except Exception:
-            pass
-        try:
-            value = entity.value if entity else ''
-        except Exception:
-            pass
-        try:
-            footprint = entity.footprint if entity else ''
-        except Exception:
-            pass
-
-        # Try to read attributes / custom properties for datasheet or manufacturer
-        try:
-            if hasattr(entity, 'attributes'):
-                for attr in entity.attributes:
-                    if attr.name.lower() == 'datasheet':
-                        datasheet = attr.value
-        except Exception:
-            pass
+        fields = _extract_entity_fields(getattr(sel, 'entity', None))
 
         payload = {
-            'name': name,
-            'ref': ref,
-            'value': value,
-            'footprint': footprint,
-            'datasheet': datasheet,
+            'name': fields['name'],
+            'ref': fields['ref'],
+            'value': fields['value'],
+            'footprint': fields['footprint'],
+            'datasheet': fields['datasheet'],
             'notes': ''
         }
 
         send_to_palette('compose_with_component', payload)
 
     except Exception:
-        app.log(f'[Copilot] describe_selected_component error: {traceback.format_exc()}')
+        log(f'[Copilot] describe_selected_component error: {_exc_text()}')
         send_to_palette('copilot_reply', {'message': 'Failed to gather selection info. See log.'})
 
 
@@ -135,6 +257,7 @@ def get_selected_component_info():
     Works only for Electronics/schematic selections.
     """
     global app, ui, palette
+    log = _LOG.append
     try:
         # Check if we're in Electronics workspace
         is_electronics = False
@@ -145,115 +268,31 @@ def get_selected_component_info():
             pass
 
         if not is_electronics:
-            send_to_palette('show_component_info', {
-                'name': '',
-                'ref': '',
-                'value': '',
-                'footprint': '',
-                'datasheet': '',
-                'description': 'Switch to Electronics workspace to view component info.'
-            })
+            send_json_to_palette('show_component_info', _NOT_ELECTRONICS_JSON)
             return
 
         # Try to get the current selection
-        sel = None
-        try:
-            sel = ui.activeSelectionSet
-        except Exception:
-            pass
-
-        if not sel:
-            send_to_palette('show_component_info', {
-                'name': '',
-                'ref': '',
-                'value': '',
-                'footprint': '',
-                'datasheet': '',
-                'description': 'No component selected. Select a component in the schematic.'
-            })
-            return
+        sel = _current_selection()
 
         if not sel:
-            send_to_palette('show_component_info', {
-                'name': '',
-                'ref': '',
-                'value': '',
-                'footprint': '',
-                'datasheet': '',
-                'description': 'Unable to access selection.'
-            })
+            send_json_to_palette('show_component_info', _NO_SELECTION_JSON)
             return
 
         # Extract entity from selection
-        entity = None
-        try:
-            entity = sel.entity
-        except Exception:
-            pass
-
-        # Gather component info with fallbacks
-        name = ''
-        ref = ''
-        value = ''
-        footprint = ''
-        datasheet = ''
-        description = ''
-
-        try:
-            name = entity.name if entity else ''
-        except Exception:
-            pass
-        try:
-            ref = entity.designator if entity else ''
-        except Exception:
-            pass
-        try:
-            value = entity.value if entity else ''
-        except Exception:
-            pass
-        try:
-            footprint = entity.footprint if entity else ''
-        except Exception:
-            pass
-        try:
-            datasheet = entity.datasheet if entity else ''
-        except Exception:
-            pass
-
-        # Try to read attributes for datasheet
-        try:
-            if hasattr(entity, 'attributes'):
-                for attr in entity.attributes:
-                    if attr.name.lower() == 'datasheet':
-                        datasheet = attr.value
-                    elif attr.name.lower() == 'description':
-                        description = attr.value
-        except Exception:
-            pass
+        fields = _extract_entity_fields(getattr(sel, 'entity', None))
 
         # Log what we found
-        app.log(f'[Copilot] Component info: name={name}, ref={ref}, value={value}, footprint={footprint}')
+        log(
+            f'[Copilot] Component info: name={fields["name"]}, ref={fields["ref"]}, '
+            f'value={fields["value"]}, footprint={fields["footprint"]}'
+        )
 
         # Send to palette
-        send_to_palette('show_component_info', {
-            'name': name,
-            'ref': ref,
-            'value': value,
-            'footprint': footprint,
-            'datasheet': datasheet,
-            'description': description
-        })
+        send_to_palette('show_component_info', fields)
 
     except Exception:
-        app.log(f'[Copilot] get_selected_component_info error: {traceback.format_exc()}')
-        send_to_palette('show_component_info', {
-            'name': '',
-            'ref': '',
-            'value': '',
-            'footprint': '',
-            'datasheet': '',
-            'description': 'Error gathering component info. See log.'
-        })
+        log(f'[Copilot] get_selected_component_info error: {_exc_text()}')
+        send_json_to_palette('show_component_info', _INFO_ERROR_JSON)
 
 
 # ============================================================================
@@ -280,12 +319,20 @@ class SchematicController:
         'Net',
         'Place',
     ]
+    # All patterns in one alternation: a single scan per command ID
+    _PATTERN_RE = re.compile('|'.join(map(re.escape, KNOWN_COMMAND_PATTERNS)))
+
+    # Seconds a discovered command list stays valid (per workspace)
+    COMMANDS_CACHE_TTL = 60
 
     def __init__(self, application, user_interface):
         self.app = application
         self.ui = user_interface
         self._context_cache = None
         self._cache_timestamp = None
+        self._commands_cache = None
+        self._commands_cache_key = None
+        self._commands_cache_timestamp = None
 
     # -------------------------------------------------------------------------
     # Context Discovery
@@ -297,10 +344,10 @@ class SchematicController:
         Returns dict with: { active_workspace, workspace_id, product_name, ... }
         """
         try:
-            import time
-            now = time.time()
+            now = time.monotonic()
             
-            # Return cached result if fresh enough (5 seconds)
+            # Return cached result if fresh enough (5 seconds); workspace
+            # switches invalidate it immediately (WorkspaceActivatedHandler)
             if not force_refresh and self._context_cache and (now - self._cache_timestamp) < 5:
                 return self._context_cache
             
@@ -345,9 +392,10 @@ class SchematicController:
             return {'active_workspace': None, 'workspace_id': None, 'is_electronics': False}
 
     def invalidate_cache(self):
-        """Invalidate the context cache"""
+        """Invalidate the context and command caches"""
         self._context_cache = None
         self._cache_timestamp = None
+        self._commands_cache = None
 
     def is_electronics_active(self):
         """Check if Electronics workspace is currently active"""
@@ -397,7 +445,7 @@ class SchematicController:
                 for cmd_def in self.ui.commandDefinitions:
                     cmd_id = cmd_def.id
                     # Match against known patterns
-                    if any(pattern in cmd_id for pattern in self.KNOWN_COMMAND_PATTERNS):
+                    if self._PATTERN_RE.search(cmd_id):
                         commands.append(cmd_id)
                         if len(commands) >= limit:
                             break
@@ -406,6 +454,47 @@ class SchematicController:
             self._log(f'discover_electronics_commands error: {e}')
             return []
 
+    def get_electronics_commands_info(self, limit=50, force_refresh=False):
+        """
+        Discover Electronics commands and their info in a single pass.
+        Returns list of { id, name, tooltip }, cached for COMMANDS_CACHE_TTL
+        seconds and refreshed when the active workspace changes.
+        """
+        try:
+            try:
+                ws = self.ui.activeWorkspace
+                workspace_id = ws.id if ws else None
+            except Exception:
+                workspace_id = None
+            key = (workspace_id, limit)
+            now = time.monotonic()
+
+            if (not force_refresh and self._commands_cache is not None
+                    and self._commands_cache_key == key
+                    and (now - self._commands_cache_timestamp) < self.COMMANDS_CACHE_TTL):
+                return self._commands_cache
+
+            commands = []
+            if self.ui.commandDefinitions:
+                for cmd_def in self.ui.commandDefinitions:
+                    cmd_id = cmd_def.id
+                    if self._PATTERN_RE.search(cmd_id):
+                        commands.append({
+                            'id': cmd_id,
+                            'name': getattr(cmd_def, 'name', ''),
+                            'tooltip': getattr(cmd_def, 'tooltip', '')
+                        })
+                        if len(commands) >= limit:
+                            break
+
+            self._commands_cache = commands
+            self._commands_cache_key = key
+            self._commands_cache_timestamp = now
+            return commands
+        except Exception as e:
+            self._log(f'get_electronics_commands_info error: {e}')
+            return []
+
     def get_command_info(self, command_id):
         """Get information about a specific command"""
         try:
@@ -426,14 +515,16 @@ class SchematicController:
 
     def execute_command(self, command_id):
         """Execute a Fusion command by ID"""
+        # itemById returns None for unknown IDs rather than raising
+        cmd_def = self.ui.commandDefinitions.itemById(command_id)
+        if cmd_def is None:
+            return False
         try:
-            cmd_def = self.ui.commandDefinitions.itemById(command_id)
-            if cmd_def:
-                cmd_def.execute()
-                return True
+            cmd_def.execute()
+            return True
         except Exception as e:
             self._log(f'execute_command error: {e}')
-        return False
+            return False
 
     def execute_place_component(self):
         """Place a component (Electronics-specific)"""
@@ -459,12 +550,28 @@ class SchematicController:
             
             # Execute the EAGLE-style command via Electron
             cmd = f'ADD R ({x_mm} {y_mm})'
-            self.app.executeTextCommand(f'Electron.run "{cmd}"')
+            electron_run(cmd, self.app)
             return f'Added resistor at ({x_mm}mm, {y_mm}mm)'
         except Exception as e:
             self._log(f'poc_add_resistor error: {e}')
             return f'Error adding resistor: {e}'
 
+    def poc_add_resistors_batch(self, coords):
+        """
+        Add resistors at several (x_mm, y_mm) positions in one Electron.run call.
+        Requires: Electronics workspace active + schematic document open.
+        """
+        try:
+            if not self.is_electronics_active():
+                return self._get_not_electronics_message(self.get_context())
+            
+            cmd = ' '.join(f'ADD R ({x_mm} {y_mm});' for x_mm, y_mm in coords)
+            electron_run(cmd, self.app)
+            return f'Added {len(coords)} resistors'
+        except Exception as e:
+            self._log(f'poc_add_resistors_batch error: {e}')
+            return f'Error adding resistors: {e}'
+
     def _get_not_electronics_message(self, ctx):
         """Return user-friendly message when not in Electronics workspace"""
         return (
@@ -478,8 +585,7 @@ class SchematicController:
 
     def _log(self, message):
         """Internal logging"""
-        if self.app:
-            self.app.log(f'[SchematicController] {message}')
+        _LOG.append(f'[SchematicController] {message}')
 
 
 # ============================================================================
@@ -496,6 +602,61 @@ def get_controller():
     return schematic_controller
 
 
+# ============================================================================
+# Palette Action Handlers (non-history)
+# ============================================================================
+
+# Exceptions propagate to HTMLEventHandler.notify, which logs the traceback
+
+def _handle_get_component_info(data):
+    get_selected_component_info()
+
+
+def _handle_get_available_commands(data):
+    command_list = get_controller().get_electronics_commands_info(limit=20)
+    send_to_palette('commands_list', {'commands': command_list})
+
+
+def _handle_execute_command(data):
+    command_id = data.get('command_id', '')
+    if get_controller().execute_command(command_id):
+        send_to_palette('copilot_reply', {'message': f'Executed command: {command_id}'})
+    else:
+        send_to_palette('copilot_reply', {'message': f'Failed to execute command: {command_id}'})
+
+
+def _handle_send_message(data):
+    # User sent a message from the UI
+    handle_user_message(data)
+
+
+def _handle_palette_ready(data):
+    # Palette has loaded
+    _LOG.append('[Copilot] Palette ready')
+    send_to_palette('copilot_status', {
+        'connected': True,
+        'message': 'Connected'
+    })
+
+
+def _handle_new_chat(data):
+    # User requested a new chat
+    _LOG.append('[Copilot] New chat requested')
+
+
+# Palette action -> handler(data)
+_ACTION_HANDLERS = {
+    'get_component_info': _handle_get_component_info,
+    'get_available_commands': _handle_get_available_commands,
+    'execute_command': _handle_execute_command,
+    'sendMessage': _handle_send_message,
+    'paletteReady': _handle_palette_ready,
+    'newChat': _handle_new_chat,
+}
+
+# Non-history palette actions whose handlers read the JSON payload
+_DATA_ACTIONS = frozenset({'sendMessage', 'execute_command'})
+
 
 class HTMLEventHandler(adsk.core.HTMLEventHandler):
     """Handle events from the palette HTML/JS"""
@@ -503,15 +664,25 @@ class HTMLEventHandler(adsk.core.HTMLEventHandler):
         super().__init__()
     
     def notify(self, args):
+        global _outbox
+        log = _LOG.append  # Bound once for the dispatch path
+        # A nested event (e.g. a command run from inside a handler) queues
+        # into the outer event's outbox, which is flushed once at the end
+        outermost = _outbox is None
+        if outermost:
+            _outbox = []
         try:
             html_args = adsk.core.HTMLEventArgs.cast(args)
             action = html_args.action
             data_str = html_args.data
             
-            app.log(f'[Copilot] Received: {action} - {data_str}')
+            if _LOG_LEVEL <= DEBUG:
+                log(f'[Copilot] Received: {action} - {data_str}')
             
-            # Parse the incoming data
-            data = json.loads(data_str) if data_str else {}
+            # Parse the incoming data only for actions that read it
+            # (paletteReady, newChat, etc. dispatch on the action alone)
+            needs_data = action in _DATA_ACTIONS or action.startswith('history_')
+            data = _json_loads(data_str) if data_str and needs_data else {}
             
             # ============================================
             # Chat History Actions (history_* prefix)
@@ -521,16 +692,17 @@ class HTMLEventHandler(adsk.core.HTMLEventHandler):
             if action.startswith('history_') and history_handlers.is_history_action(action):
                 try:
                     # Route to history handlers
-                    response = history_handlers.handle_history_action(action, data)
+                    response_action, response_json = history_handlers.handle_history_action_json(
+                        action, data
+                    )
                     
                     # Send response back with proper action type
                     # Response action is: history_list_result, history_create_result,
                     # history_load_result, history_ok, or history_error
-                    response_action = response.get('action', 'history_error')
-                    send_to_palette(response_action, response)
+                    send_json_to_palette(response_action, response_json)
                     
                 except Exception as e:
-                    app.log(f'[Copilot] History error: {traceback.format_exc()}')
+                    log(f'[Copilot] History error: {_exc_text()}')
                     # Send error response with requestId passthrough
                     error_response = {
                         'action': 'history_error',
@@ -548,70 +720,23 @@ class HTMLEventHandler(adsk.core.HTMLEventHandler):
                 return
             
             # ============================================
-            # Component Info and Commands
-            # ============================================
-            if action == 'get_component_info':
-                try:
-                    get_selected_component_info()
-                except Exception as e:
-                    app.log(f'[Copilot] Error getting component info: {traceback.format_exc()}')
-                html_args.returnData = 'OK'
-                return
-            
-            if action == 'get_available_commands':
-                try:
-                    controller = get_controller()
-                    commands = controller.discover_electronics_commands(limit=20)
-                    command_list = []
-                    for cmd_id in commands:
-                        info = controller.get_command_info(cmd_id)
-                        if info:
-                            command_list.append(info)
-                    send_to_palette('commands_list', {'commands': command_list})
-                except Exception as e:
-                    app.log(f'[Copilot] Error discovering commands: {traceback.format_exc()}')
-                html_args.returnData = 'OK'
-                return
-            
-            if action == 'execute_command':
-                try:
-                    command_id = data.get('command_id', '')
-                    controller = get_controller()
-                    if controller.execute_command(command_id):
-                        send_to_palette('copilot_reply', {'message': f'Executed command: {command_id}'})
-                    else:
-                        send_to_palette('copilot_reply', {'message': f'Failed to execute command: {command_id}'})
-                except Exception as e:
-                    app.log(f'[Copilot] Error executing command: {traceback.format_exc()}')
-                html_args.returnData = 'OK'
-                return
-            
-            # ============================================
-            # Existing Message Actions
+            # Component Info, Commands and Messages
             # ============================================
-            if action == 'sendMessage':
-                # User sent a message from the UI
-                handle_user_message(data)
-            
-            elif action == 'paletteReady':
-                # Palette has loaded
-                app.log('[Copilot] Palette ready')
-                send_to_palette('copilot_status', {
-                    'connected': True,
-                    'message': 'Connected'
-                })
-            
-            elif action == 'newChat':
-                # User requested a new chat
-                app.log('[Copilot] New chat requested')
+            handler = _ACTION_HANDLERS.get(action)
+            if handler:
+                handler(data)
             
             # Return success
             html_args.returnData = 'OK'
             
         except:
-            app.log(f'[Copilot] Error in HTMLEventHandler: {traceback.format_exc()}')
+            log(f'[Copilot] Error in HTMLEventHandler: {_exc_text()}')
             if args:
                 args.returnData = 'ERROR'
+        finally:
+            if outermost:
+                _flush_outbox()
+            _LOG.flush()
 
 
 class PaletteClosedHandler(adsk.core.UserInterfaceGeneralEventHandler):
@@ -623,36 +748,51 @@ class PaletteClosedHandler(adsk.core.UserInterfaceGeneralEventHandler):
         try:
             global palette
             palette = None
-            app.log('[Copilot] Palette closed')
+            _LOG.append('[Copilot] Palette closed')
         except:
-            app.log(f'[Copilot] Error in close handler: {traceback.format_exc()}')
+            _LOG.append(f'[Copilot] Error in close handler: {_exc_text()}')
+        finally:
+            _LOG.flush()
+
+
+def _cmd_component_info(message):
+    try:
+        get_selected_component_info()
+    except Exception as e:
+        _LOG.append(f'[Copilot] Error: {_exc_text()}')
+        send_json_to_palette('show_component_info', _INFO_ERROR_JSON)
+
+
+def _cmd_add_resistor(message):
+    # Chat-triggered test
+    try:
+        test_add_resistor()
+        send_to_palette('copilot_reply', {"message": "OK. Tried to add a resistor at (10mm, 10mm)."})
+    except Exception as e:
+        send_to_palette('copilot_reply', {"message": f"Failed to add resistor.\n{_exc_text()}"})
+
+
+# Chat commands (lowercase) -> handler(message)
+_CMD_TABLE = {
+    '/component_info': _cmd_component_info,
+    '/add_resistor': _cmd_add_resistor,
+    '/test_resistor': _cmd_add_resistor,
+}
+
+# Matches any known command (plus optional arguments) in one pass
+_CMD_RE = re.compile(
+    r'^(' + '|'.join(re.escape(cmd) for cmd in _CMD_TABLE) + r')(?:\s+.*)?$',
+    re.IGNORECASE | re.DOTALL
+)
 
 
 def handle_user_message(data):
+    log = _LOG.append
     message = data.get('message', '').strip()
-    app.log(f'[Copilot] User message: {message}')
-    # Handle /component_info command
-    if message.lower() == '/component_info':
-        try:
-            get_selected_component_info()
-        except Exception as e:
-            app.log(f'[Copilot] Error: {traceback.format_exc()}')
-            send_to_palette('show_component_info', {
-                'name': '',
-                'ref': '',
-                'value': '',
-                'footprint': '',
-                'datasheet': '',
-                'description': 'Error gathering component info. See log.'
-            })
-        return
-    # Chat-triggered test
-    if message.lower() in ("/add_resistor", "/test_resistor"):
-        try:
-            test_add_resistor()
-            send_to_palette('copilot_reply', {"message": "OK. Tried to add a resistor at (10mm, 10mm)."})
-        except Exception as e:
-            send_to_palette('copilot_reply', {"message": f"Failed to add resistor.\n{traceback.format_exc()}"})
+    log(f'[Copilot] User message: {message}')
+    m = _CMD_RE.match(message)
+    if m:
+        _CMD_TABLE[m.group(1).lower()](message)
         return
 
     # Default behavior (existing)
@@ -661,36 +801,67 @@ def handle_user_message(data):
 
 
 
-def send_to_palette(action, data):
-    """Send data to the palette HTML/JS"""
+# Messages queued while an HTML event is being handled; None outside events
+_outbox = None
+
+
+def _flush_outbox():
+    """Send queued palette messages, several at once as a single 'batch' message."""
+    global _outbox
+    pending, _outbox = _outbox, None
+    if not pending:
+        return
+    if len(pending) == 1:
+        send_json_to_palette(*pending[0])
+    else:
+        # Payloads are already encoded; splice them into the batch envelope
+        messages = ','.join(
+            f'{{"action":{_json_dumps(action)},"data":{data_str}}}'
+            for action, data_str in pending
+        )
+        send_json_to_palette('batch', f'{{"messages":[{messages}]}}')
+
+
+def send_json_to_palette(action, data_str):
+    """Send an already JSON-encoded payload to the palette HTML/JS"""
     global palette
+    if _outbox is not None:
+        _outbox.append((action, data_str))
+        return
     try:
         if palette:
-            palette.sendInfoToHTML(action, json.dumps(data))
-            app.log(f'[Copilot] Sent to palette: {action}')
+            palette.sendInfoToHTML(action, data_str)
+            if _LOG_LEVEL <= DEBUG:
+                _LOG.append(f'[Copilot] Sent to palette: {action}')
     except:
-        app.log(f'[Copilot] Error sending to palette: {traceback.format_exc()}')
+        _LOG.append(f'[Copilot] Error sending to palette: {_exc_text()}')
+
+
+def send_to_palette(action, data):
+    """Send data to the palette HTML/JS (queued until the current HTML event ends)"""
+    try:
+        data_str = _json_dumps(data)
+    except:
+        _LOG.append(f'[Copilot] Error sending to palette: {_exc_text()}')
+        return
+    send_json_to_palette(action, data_str)
 
 
 def create_palette():
     """Create and show the Copilot palette"""
-    global palette, handlers
+    global palette
     
     try:
         # Delete any existing palette to ensure fresh creation
         existing_palette = ui.palettes.itemById(PALETTE_ID)
         if existing_palette:
             existing_palette.deleteMe()
-            app.log('[Copilot] Deleted existing palette')
+            _LOG.append('[Copilot] Deleted existing palette')
         
-        # Get the path to the HTML file (use forward slashes for URL)
-        add_in_path = os.path.dirname(os.path.realpath(__file__))
-        html_path = os.path.join(add_in_path, 'palette.html')
-        # Convert to forward slashes for proper URL formatting
-        html_path = html_path.replace('\\', '/')
+        html_path = _PALETTE_HTML_PATH
         
-        app.log(f'[Copilot] HTML path: {html_path}')
-        app.log(f'[Copilot] Raw add-in path: {add_in_path}')
+        _LOG.append(f'[Copilot] HTML path: {html_path}')
+        _LOG.append(f'[Copilot] Raw add-in path: {_ADD_IN_DIR}')
         
         # Create the palette
         palette = ui.palettes.add(
@@ -709,23 +880,35 @@ def create_palette():
         palette.dockingState = adsk.core.PaletteDockingStates.PaletteDockStateRight
         
         # Add event handlers
-        html_handler = HTMLEventHandler()
-        palette.incomingFromHTML.add(html_handler)
-        handlers.append(html_handler)
-        
-        close_handler = PaletteClosedHandler()
-        palette.closed.add(close_handler)
-        handlers.append(close_handler)
+        palette.incomingFromHTML.add(_handler('html', HTMLEventHandler))
+        palette.closed.add(_handler('closed', PaletteClosedHandler))
         
-        app.log(f'[Copilot] Palette created: {html_path}')
+        _LOG.append(f'[Copilot] Palette created: {html_path}')
         
         return palette
         
     except:
-        app.log(f'[Copilot] Error creating palette: {traceback.format_exc()}')
+        error = _exc_text()
+        _LOG.append(f'[Copilot] Error creating palette: {error}')
         if ui:
-            ui.messageBox(f'Error creating palette:\n{traceback.format_exc()}')
+            ui.messageBox(f'Error creating palette:\n{error}')
         return None
+    finally:
+        _LOG.flush()
+
+
+class WorkspaceActivatedHandler(adsk.core.WorkspaceEventHandler):
+    """Invalidate cached schematic context when the user switches workspace"""
+    def __init__(self):
+        super().__init__()
+    
+    def notify(self, args):
+        try:
+            if schematic_controller is not None:
+                schematic_controller.invalidate_cache()
+        except:
+            _LOG.append(f'[Copilot] Error in workspace handler: {_exc_text()}')
+            _LOG.flush()
 
 
 class ShowPaletteCommandExecuteHandler(adsk.core.CommandEventHandler):
@@ -738,7 +921,7 @@ class ShowPaletteCommandExecuteHandler(adsk.core.CommandEventHandler):
             create_palette()
         except:
             if ui:
-                ui.messageBox(f'Command failed:\n{traceback.format_exc()}')
+                ui.messageBox(f'Command failed:\n{_exc_text()}')
 
 
 class ShowPaletteCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
@@ -749,12 +932,10 @@ class ShowPaletteCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
     def notify(self, args):
         try:
             cmd = args.command
-            on_execute = ShowPaletteCommandExecuteHandler()
-            cmd.execute.add(on_execute)
-            handlers.append(on_execute)
+            cmd.execute.add(_handler('execute', ShowPaletteCommandExecuteHandler))
         except:
             if ui:
-                ui.messageBox(f'Command creation failed:\n{traceback.format_exc()}')
+                ui.messageBox(f'Command creation failed:\n{_exc_text()}')
 
 
 def run(context):
@@ -775,9 +956,10 @@ def run(context):
             )
         
         # Add command created handler
-        on_command_created = ShowPaletteCommandCreatedHandler()
-        cmd_def.commandCreated.add(on_command_created)
-        handlers.append(on_command_created)
+        cmd_def.commandCreated.add(_handler('command_created', ShowPaletteCommandCreatedHandler))
+        
+        # Refresh schematic context as soon as the workspace changes
+        ui.workspaceActivated.add(_handler('workspace_activated', WorkspaceActivatedHandler))
         
         # Add to UI (Add-Ins panel)
         add_ins_panel = ui.allToolbarPanels.itemById('SolidScriptsAddinsPanel')
@@ -789,16 +971,17 @@ def run(context):
         # Auto-show the palette on startup
         create_palette()
         
-        app.log('[Copilot] ElectrifyCopilotUI add-in started')
+        _LOG.append('[Copilot] ElectrifyCopilotUI add-in started')
+        _LOG.flush()
         
     except:
         if ui:
-            ui.messageBox(f'Failed to start:\n{traceback.format_exc()}')
+            ui.messageBox(f'Failed to start:\n{_exc_text()}')
 
 
 def stop(context):
     """Called when the add-in is stopped."""
-    global app, ui, palette, handlers
+    global app, ui, palette
     try:
         # Remove the palette (get fresh reference)
         palette_to_delete = ui.palettes.itemById(PALETTE_ID)
@@ -807,9 +990,13 @@ def stop(context):
                 palette_to_delete.deleteMe()
             except:
                 # Palette may already be deleted or not deletable
-                app.log('[Copilot] Could not delete palette (may already be gone)')
+                _LOG.append('[Copilot] Could not delete palette (may already be gone)')
         palette = None
         
+        workspace_handler = handlers.get('workspace_activated')
+        if workspace_handler:
+            ui.workspaceActivated.remove(workspace_handler)
+        
         # Remove command definition
         cmd_def = ui.commandDefinitions.itemById('ShowElectrifyCopilot')
         if cmd_def:
@@ -822,10 +1009,16 @@ def stop(context):
             if control:
                 control.deleteMe()
         
-        handlers = []
+        handlers.clear()
+        
+        # Stop the event flusher and close pooled DB connections; a reload
+        # re-imports chat_history and would otherwise leave them running
+        chat_history.close_pool()
         
-        app.log('[Copilot] ElectrifyCopilotUI add-in stopped')
+        _LOG.append('[Copilot] ElectrifyCopilotUI add-in stopped')
         
     except:
         if ui:
-            ui.messageBox(f'Failed to stop:\n{traceback.format_exc()}')
+            ui.messageBox(f'Failed to stop:\n{_exc_text()}')
+    finally:
+        _LOG.flush()
@@ -1512,6 +1512,14 @@
                         handleHistoryError(data);
                         return 'OK';
 
+                    case 'batch':
+                        // Several host messages sent in one bridge call
+                        // Expected data: { messages: [{ action, data }, ...] }
+                        (data.messages || []).forEach(function (m) {
+                            window.fusionJavaScriptHandler.handle(m.action, JSON.stringify(m.data));
+                        });
+                        return 'OK';
+
                     default:
                         console.warn('[Handler] Unknown action:', action);
                         return 'OK';
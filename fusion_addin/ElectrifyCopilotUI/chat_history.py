@@ -6,17 +6,50 @@
 
 import os
 import json
+import atexit
+import queue
 import sqlite3
+import threading
 import uuid
 import time
+import itertools
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 
 # Database configuration
 DB_FILENAME = 'copilot_chat_history.db'
-CURRENT_SCHEMA_VERSION = 1
+CURRENT_SCHEMA_VERSION = 5
 PROTOCOL_VERSION = '1.1.0'
 
+# Idle connections kept open between calls
+POOL_SIZE = 4
+
+# Applied to every new connection (these settings are not stored in the file)
+_CONNECTION_PRAGMAS = (
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA synchronous = NORMAL',  # Safe with WAL: fsync at checkpoints, not every commit
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -64000',  # 64 MB page cache
+    'PRAGMA mmap_size = 268435456',  # 256 MB
+    'PRAGMA busy_timeout = 5000',
+)
+
+# Seconds a get_session() result is reused (writers invalidate it sooner)
+SESSION_CACHE_TTL = 2.0
+
+# log_event() writes are buffered and flushed in batches
+EVENT_FLUSH_INTERVAL = 0.5
+EVENT_BATCH_SIZE = 100
+
+# UPDATE ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Set by init_database(): True when the messages_fts index exists
+_fts_enabled = False
+
 
 def get_db_path() -> str:
     """Get the database file path (in the add-in directory)."""
@@ -25,13 +58,92 @@ def get_db_path() -> str:
 
 
 def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory and foreign keys enabled."""
-    conn = sqlite3.connect(get_db_path())
+    """Get a database connection with row factory, foreign keys and performance PRAGMAs."""
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA foreign_keys = ON')
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+# ============================================
+# Connection Pool
+# ============================================
+
+_pool: Optional[queue.LifoQueue] = None
+_pool_path: Optional[str] = None
+_pool_lock = threading.Lock()
+
+# Serializes writers so they never contend for SQLite's write lock
+_write_lock = threading.RLock()
+
+
+def _get_pool() -> queue.LifoQueue:
+    """Get the pool for the current database path (a new path starts a new pool)."""
+    global _pool, _pool_path
+    path = get_db_path()
+    with _pool_lock:
+        if _pool is None or _pool_path != path:
+            _drain(_pool)
+            _session_cache.clear()
+            _pool = queue.LifoQueue(maxsize=POOL_SIZE)
+            _pool_path = path
+        return _pool
+
+
+def _drain(pool: Optional[queue.LifoQueue]):
+    """Close every idle connection in pool."""
+    while pool is not None:
+        try:
+            pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+@contextmanager
+def borrow(write: bool = False):
+    """
+    Borrow a pooled connection for the duration of a with-block.
+    
+    Connections stay open across calls so SQLite keeps its parsed schema and
+    page cache. Anything left uncommitted is rolled back before the
+    connection goes back to the pool.
+    
+    Args:
+        write: Hold the writer lock while the connection is in use
+    """
+    pool = _get_pool()
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_connection()
+    
+    try:
+        with _write_lock if write else nullcontext():
+            yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def close_pool():
+    """
+    Stop the event flusher, flush buffered events and close all idle pooled
+    connections (e.g. when the add-in stops). init_database() restarts the flusher.
+    """
+    global _pool, _pool_path
+    _stop_event_flusher()
+    flush_events()
+    with _pool_lock:
+        _drain(_pool)
+        _pool = None
+        _pool_path = None
+
+
 # ============================================
 # Timestamp Utilities
 # ============================================
@@ -41,9 +153,18 @@ def _ts_now() -> int:
     return int(time.time() * 1000)
 
 
+@lru_cache(maxsize=4096)
+def _iso_second(seconds: int) -> str:
+    """ISO 8601 UTC date and time (to the second) for a Unix timestamp."""
+    t = time.gmtime(seconds)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}")
+
+
 def _ts_to_iso(ts: int) -> str:
-    """Convert Unix timestamp (ms) to ISO 8601 string."""
-    return datetime.utcfromtimestamp(ts / 1000).isoformat() + 'Z'
+    """Convert Unix timestamp (ms) to ISO 8601 string, e.g. 2026-01-14T12:34:56.789Z."""
+    seconds, ms = divmod(int(ts), 1000)
+    return f"{_iso_second(seconds)}.{ms:03d}Z"
 
 
 def _iso_to_ts(iso_str: str) -> int:
@@ -60,35 +181,70 @@ def _iso_to_ts(iso_str: str) -> int:
 
 def init_database():
     """Initialize the database schema with migrations."""
-    conn = get_connection()
-    try:
+    global _fts_enabled
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         
-        # Schema version table (for migrations)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS schema_version (
-                version INTEGER PRIMARY KEY,
-                applied_at INTEGER NOT NULL,
-                description TEXT
-            )
-        ''')
+        # WAL lets readers run alongside the writer; the mode is persistent
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA wal_autocheckpoint = 1000')
         
-        # Check current schema version
-        cursor.execute('SELECT MAX(version) as v FROM schema_version')
-        row = cursor.fetchone()
-        current_version = row['v'] if row['v'] is not None else 0
+        # Schema version lives in the file header (PRAGMA user_version)
+        current_version = _read_schema_version(cursor)
         
         # Run migrations
         if current_version < 1:
             _migrate_v1(cursor)
-            cursor.execute('''
-                INSERT INTO schema_version (version, applied_at, description)
-                VALUES (1, ?, 'Initial schema: sessions, messages, events tables')
-            ''', (_ts_now(),))
+        
+        # Full-text search (retried on every start until FTS5 is available)
+        _fts_enabled = _has_fts(cursor) or _migrate_v2(cursor)
+        
+        if current_version < 3:
+            _migrate_v3(cursor)
+        
+        if current_version < 4:
+            _migrate_v4(cursor)
+        
+        if current_version < 5:
+            _migrate_v5(cursor)
+        
+        if current_version < CURRENT_SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {CURRENT_SCHEMA_VERSION}')
         
         conn.commit()
-    finally:
-        conn.close()
+    
+    _start_event_flusher()
+
+
+def _read_schema_version(cursor: sqlite3.Cursor) -> int:
+    """
+    Read the schema version from PRAGMA user_version.
+    
+    Databases created before the version moved into the header recorded
+    applied migrations in a schema_version table; that is read (not
+    written) until the table is dropped in a later migration.
+    """
+    cursor.execute('PRAGMA user_version')
+    version = cursor.fetchone()[0]
+    if version:
+        return version
+    
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    )
+    if cursor.fetchone() is None:
+        return 0
+    cursor.execute('SELECT MAX(version) as v FROM schema_version')
+    row = cursor.fetchone()
+    return row['v'] or 0
+
+
+def _has_fts(cursor: sqlite3.Cursor) -> bool:
+    """Whether the messages_fts index exists."""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    )
+    return cursor.fetchone() is not None
 
 
 def _migrate_v1(cursor: sqlite3.Cursor):
@@ -98,6 +254,7 @@ def _migrate_v1(cursor: sqlite3.Cursor):
     Tables:
       - sessions(id TEXT PK, title TEXT, createdAt INT, updatedAt INT, pinned INT, summary TEXT NULL)
       - messages(id TEXT PK, sessionId TEXT, role TEXT, content TEXT, ts INT, metaJson TEXT)
+        (status TEXT is added by v5)
       - events(id TEXT PK, sessionId TEXT, type TEXT, ts INT, dataJson TEXT)
     
     Indexes:
@@ -170,31 +327,198 @@ def _migrate_v1(cursor: sqlite3.Cursor):
     ''')
 
 
+def _migrate_v2(cursor: sqlite3.Cursor) -> bool:
+    """
+    Migration v2: Full-text index over message content.
+    
+    messages_fts is an external-content FTS5 table (it stores only the index,
+    keyed by messages.rowid) kept in sync by triggers, and is rebuilt from
+    the existing messages.
+    
+    Returns False if this SQLite build lacks FTS5; search then falls back
+    to LIKE and the migration is retried on the next start.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content,
+                content='messages',
+                content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return False
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+    ''')
+    cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    return True
+
+
+def _migrate_v3(cursor: sqlite3.Cursor):
+    """
+    Migration v3: Composite index matching the session listing order.
+    
+    ORDER BY pinned DESC, updatedAt DESC, id DESC then walks the index and
+    stops after LIMIT rows instead of sorting every session.
+    idx_sessions_pinned becomes redundant.
+    """
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sessions_list 
+        ON sessions(pinned DESC, updatedAt DESC, id DESC)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_sessions_pinned')
+
+
+def _migrate_v4(cursor: sqlite3.Cursor):
+    """
+    Migration v4: Composite (sessionId, ts) indexes for messages and events.
+    
+    Per-session reads filter on sessionId and order by ts; one index range
+    serves both, walked backwards for ORDER BY ts DESC. They replace the
+    single-column indexes, which they cover as a prefix.
+    """
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_sessionId_ts 
+        ON messages(sessionId, ts)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_sessionId_ts 
+        ON events(sessionId, ts)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_messages_sessionId')
+    cursor.execute('DROP INDEX IF EXISTS idx_messages_ts')
+    cursor.execute('DROP INDEX IF EXISTS idx_events_sessionId')
+
+
+def _migrate_v5(cursor: sqlite3.Cursor):
+    """
+    Migration v5: messages.status column.
+    
+    Status is the only meta field read when listing messages; storing it in
+    its own column spares a json.loads per row. Existing rows are backfilled
+    from metaJson.
+    """
+    cursor.execute('ALTER TABLE messages ADD COLUMN status TEXT')
+    try:
+        cursor.execute('''
+            UPDATE messages SET status = json_extract(metaJson, '$.status')
+            WHERE metaJson IS NOT NULL
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without JSON functions
+        cursor.execute('SELECT id, metaJson FROM messages WHERE metaJson IS NOT NULL')
+        rows = [(json.loads(row['metaJson']).get('status'), row['id']) for row in cursor.fetchall()]
+        cursor.executemany('UPDATE messages SET status = ? WHERE id = ?', rows)
+
+
 def get_schema_version() -> int:
     """Get current schema version."""
-    conn = get_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT MAX(version) as v FROM schema_version')
-        row = cursor.fetchone()
-        return row['v'] if row and row['v'] else 0
+        with borrow() as conn:
+            return _read_schema_version(conn.cursor())
     except Exception:
         return 0
-    finally:
-        conn.close()
+
+
+# ============================================
+# Content Search
+# ============================================
+
+# Matching messages (alias m); takes one parameter from _content_match()
+_FTS_MATCH_FROM = '''
+    FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+    WHERE messages_fts MATCH ?
+'''
+_LIKE_MATCH_FROM = '''
+    FROM messages m WHERE m.content LIKE ?
+'''
+
+# Correlated LIKE fallback for "does session s have a matching message"
+_LIKE_EXISTS_SQL = '''EXISTS (
+                    SELECT 1 FROM messages m
+                    WHERE m.sessionId = s.id AND m.content LIKE ?
+                )'''
+
+# Snippet around the first hit, cut by SQLite (no markers: the UI escapes HTML)
+_FTS_SNIPPET = "snippet(messages_fts, 0, '', '', '…', 10)"
+
+
+def _fts_query(text: str) -> str:
+    """Quote user text as one FTS5 phrase so it is never parsed as query syntax.
+    
+    The trailing * makes the last word a prefix, so partially typed words
+    still match as they did with LIKE.
+    """
+    return '"' + text.replace('"', '""') + '"*'
+
+
+def _content_match(query: str) -> Tuple[str, str]:
+    """FROM/WHERE clause selecting messages whose content matches query, plus its parameter."""
+    if _fts_enabled:
+        return _FTS_MATCH_FROM, _fts_query(query)
+    return _LIKE_MATCH_FROM, f'%{query}%'
+
+
+def _new_id() -> str:
+    """
+    New message/event id: 32 hex chars (no hyphens) to keep rows and indexes small.
+    
+    Session ids stay hyphenated UUIDs; the protocol validates them as such.
+    """
+    return uuid.uuid4().hex
+
+
+# ============================================
+# Session Cache
+# ============================================
+
+# session_id -> (monotonic expiry, session dict)
+_session_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+def _invalidate(session_id: str):
+    """Drop the cached copy of a session after writing to it."""
+    _session_cache.pop(session_id, None)
 
 
 # ============================================
 # Session CRUD Operations
 # ============================================
 
+# Message count and preview for each session row, fetched in the same query
+_SESSION_STATS_TMPL = '''
+    (SELECT COUNT(*) FROM messages WHERE sessionId = {table}.id) AS messageCount,
+    (SELECT substr(content, 1, 100) FROM messages
+     WHERE sessionId = {table}.id ORDER BY ts DESC LIMIT 1) AS preview
+'''
+_SESSION_STATS_SQL = _SESSION_STATS_TMPL.format(table='s')
+# RETURNING clauses can't see a table alias
+_RETURNING_STATS_SQL = _SESSION_STATS_TMPL.format(table='sessions')
+
 def create_session(title: str = "New Chat") -> Dict[str, Any]:
     """Create a new chat session."""
     session_id = str(uuid.uuid4())
     now = _ts_now()
     
-    conn = get_connection()
-    try:
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO sessions (id, title, createdAt, updatedAt, pinned, titleSetByUser, summary)
@@ -203,58 +527,103 @@ def create_session(title: str = "New Chat") -> Dict[str, Any]:
         conn.commit()
         
         return _make_session_response(session_id, title, now, now, False, None, 0, '', False)
-    finally:
-        conn.close()
 
 
 def get_session(session_id: str) -> Optional[Dict[str, Any]]:
-    """Get a single session by ID."""
-    conn = get_connection()
-    try:
+    """Get a single session by ID (cached for SESSION_CACHE_TTL seconds)."""
+    cached = _session_cache.get(session_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return dict(cached[1])
+    
+    with borrow() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM sessions WHERE id = ?', (session_id,))
+        cursor.execute(f'''
+            SELECT s.*, {_SESSION_STATS_SQL} FROM sessions s WHERE id = ?
+        ''', (session_id,))
         row = cursor.fetchone()
         
         if row:
-            return _row_to_session(row, cursor)
+            session = _row_to_session(row)
+            _session_cache[session_id] = (time.monotonic() + SESSION_CACHE_TTL, session)
+            return dict(session)
         return None
-    finally:
-        conn.close()
+
+
+def _parse_cursor(cursor: str) -> Tuple[int, int, str]:
+    """Parse a "pinned:updatedAt:sessionId" list_sessions cursor."""
+    pinned, sep, rest = cursor.partition(':')
+    ts, sep2, session_id = rest.partition(':')
+    if not sep or not sep2 or not session_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(pinned), int(ts), session_id
 
 
 def list_sessions(
     include_archived: bool = False,
     limit: int = 50,
     offset: int = 0,
-    search_query: str = ''
-) -> List[Dict[str, Any]]:
-    """List sessions ordered by pinned status and update time."""
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
+    search_query: str = '',
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    List sessions ordered by pinned status and update time.
+    
+    Args:
+        include_archived: Unused (kept for protocol compatibility)
+        limit: Maximum sessions to return
+        offset: Deprecated; only applied when no cursor is given
+        search_query: Filter by title, summary or message content
+        cursor: Pagination cursor ("pinned:updatedAt:sessionId") from nextCursor
+    
+    Returns:
+        {'sessions': [...], 'nextCursor': '...' | None}
+    """
+    with borrow() as conn:
+        db_cursor = conn.cursor()
         
-        query = 'SELECT * FROM sessions WHERE 1=1'
+        query = f'SELECT s.*, {_SESSION_STATS_SQL} FROM sessions s WHERE 1=1'
         params: List[Any] = []
         
         if search_query:
             # Search in title and summary, also search message content
-            query += ''' AND (
+            search_pattern = f'%{search_query}%'
+            if _fts_enabled:
+                content_sql = f'id IN (SELECT m.sessionId {_FTS_MATCH_FROM})'
+                content_param = _fts_query(search_query)
+            else:
+                # Semi-join: stops at the first matching message of each session
+                content_sql = _LIKE_EXISTS_SQL
+                content_param = search_pattern
+            query += f''' AND (
                 title LIKE ? 
                 OR summary LIKE ? 
-                OR id IN (SELECT DISTINCT sessionId FROM messages WHERE content LIKE ?)
+                OR {content_sql}
             )'''
-            search_pattern = f'%{search_query}%'
-            params.extend([search_pattern, search_pattern, search_pattern])
+            params.extend([search_pattern, search_pattern, content_param])
         
-        query += ' ORDER BY pinned DESC, updatedAt DESC LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
+        if cursor:
+            # Keyset pagination: resume after the cursor row in listing order,
+            # an index range scan on idx_sessions_list however deep the page.
+            # The cursor carries the row's pinned flag as of the previous page,
+            # so unpinning or deleting that session does not move the boundary.
+            query += ' AND (pinned, updatedAt, id) < (?, ?, ?)'
+            params.extend(_parse_cursor(cursor))
+            offset = 0
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        query += ' ORDER BY pinned DESC, updatedAt DESC, id DESC LIMIT ? OFFSET ?'
+        params.extend([limit + 1, offset])  # +1 to check for more
         
-        return [_row_to_session(row, cursor) for row in rows]
-    finally:
-        conn.close()
+        db_cursor.execute(query, params)
+        rows = db_cursor.fetchall()
+        
+        sessions = [_row_to_session(row) for row in rows[:limit]]
+        
+        next_cursor = None
+        if len(rows) > limit and sessions:
+            last = rows[len(sessions) - 1]
+            next_cursor = f"{int(last['pinned'] or 0)}:{last['updatedAt']}:{last['id']}"
+        
+        return {'sessions': sessions, 'nextCursor': next_cursor}
 
 
 def search_sessions(
@@ -292,9 +661,8 @@ def search_sessions(
         return {'sessions': [], 'nextCursor': None, 'totalMatches': 0}
     
     search_pattern = f'%{query}%'
-    conn = get_connection()
-    
-    try:
+    match_from, match_param = _content_match(query)
+    with borrow() as conn:
         db_cursor = conn.cursor()
         
         # Build the search query
@@ -306,16 +674,15 @@ def search_sessions(
         '''
         
         # Find sessions with matching message content
-        content_match_sql = '''
-            SELECT DISTINCT sessionId as id, 'content' as match_source
-            FROM messages 
-            WHERE content LIKE ?
+        content_match_sql = f'''
+            SELECT DISTINCT m.sessionId as id, 'content' as match_source
+            {match_from}
         '''
         
         # Combine results
         if search_content:
-            combined_sql = f'''
-                WITH matches AS (
+            session_matches_sql = f'''
+                matches AS (
                     {title_match_sql}
                     UNION ALL
                     {content_match_sql}
@@ -328,29 +695,34 @@ def search_sessions(
                     FROM matches
                     GROUP BY id
                 )
-                SELECT 
-                    s.*,
-                    sm.match_sources,
-                    sm.source_count
-                FROM sessions s
-                INNER JOIN session_matches sm ON s.id = sm.id
             '''
-            params = [search_pattern, search_pattern]
+            params = [search_pattern, match_param]
         else:
-            combined_sql = f'''
-                WITH session_matches AS (
+            session_matches_sql = '''
+                session_matches AS (
                     SELECT id, 'title' as match_sources, 1 as source_count
                     FROM sessions 
                     WHERE title LIKE ?
                 )
+            '''
+            params = [search_pattern]
+        
+        # total_matches counts every matching session before the cursor
+        # filter is applied in the outer query, so it is the same on each page
+        combined_sql = f'''
+            WITH {session_matches_sql},
+            matched AS (
                 SELECT 
                     s.*,
                     sm.match_sources,
-                    sm.source_count
+                    sm.source_count,
+                    COUNT(*) OVER () as total_matches
                 FROM sessions s
                 INNER JOIN session_matches sm ON s.id = sm.id
-            '''
-            params = [search_pattern]
+            )
+            SELECT s.*, {_SESSION_STATS_SQL}
+            FROM matched s
+        '''
         
         # Add cursor-based pagination
         if cursor_ts is not None and cursor_id is not None:
@@ -378,7 +750,7 @@ def search_sessions(
         sessions = []
         for row in rows:
             # Base session data
-            session = _row_to_session(row, db_cursor)
+            session = _row_to_session(row)
             
             # Determine match type
             match_sources = row['match_sources'] if row['match_sources'] else 'title'
@@ -395,20 +767,20 @@ def search_sessions(
                 session['matchCount'] = match_info['count']
                 session['snippet'] = match_info['snippet']
             else:
-                session['matchCount'] = 1 if query.lower() in session['title'].lower() else 0
-                session['snippet'] = _highlight_match(session['title'], query)
+                # Title-only search: every row matched on its title
+                title = session['title']
+                session['matchCount'] = 1
+                session['snippet'] = title if len(title) <= 100 else title[:100] + '...'
             
             sessions.append(session)
         
         # Generate next cursor
         next_cursor = None
-        if has_more and sessions:
-            last = sessions[-1]
-            last_ts = _iso_to_ts(last['updatedAt'])
-            next_cursor = f"{last_ts}:{last['id']}"
+        if has_more and rows:
+            next_cursor = f"{rows[-1]['updatedAt']}:{rows[-1]['id']}"
         
-        # Get total count (without pagination)
-        total_matches = _count_search_matches(db_cursor, query, search_content)
+        # Total count (without pagination), from the same statement
+        total_matches = rows[0]['total_matches'] if rows else 0
         
         return {
             'sessions': sessions,
@@ -416,40 +788,42 @@ def search_sessions(
             'totalMatches': total_matches
         }
         
-    finally:
-        conn.close()
 
 
 def _get_search_match_info(cursor: sqlite3.Cursor, session_id: str, query: str) -> Dict[str, Any]:
-    """Get match count and best snippet for a session."""
-    search_pattern = f'%{query}%'
+    """Get match count and best snippet for a session (one statement).
     
-    # Count matching messages
-    cursor.execute('''
-        SELECT COUNT(*) as cnt FROM messages 
-        WHERE sessionId = ? AND content LIKE ?
-    ''', (session_id, search_pattern))
-    count_row = cursor.fetchone()
-    count = count_row['cnt'] if count_row else 0
+    With FTS5 the snippet is cut by SQLite from the best-ranked message;
+    the LIKE fallback snips the first matching message in Python.
+    """
+    match_from, match_param = _content_match(query)
     
-    # Get first matching message for snippet
-    cursor.execute('''
-        SELECT content FROM messages 
-        WHERE sessionId = ? AND content LIKE ?
-        ORDER BY ts ASC
+    # snippet() can't share a SELECT with an aggregate, so count in a subquery
+    if _fts_enabled:
+        snippet_col, order_by = _FTS_SNIPPET, 'rank'
+    else:
+        snippet_col, order_by = 'm.content', 'm.ts ASC'
+    cursor.execute(f'''
+        SELECT
+            (SELECT COUNT(*) {match_from} AND m.sessionId = ?) as cnt,
+            {snippet_col} as snippet
+        {match_from} AND m.sessionId = ?
+        ORDER BY {order_by}
         LIMIT 1
-    ''', (session_id, search_pattern))
-    snippet_row = cursor.fetchone()
+    ''', (match_param, session_id, match_param, session_id))
+    row = cursor.fetchone()
+    if row is None:
+        return {'count': 0, 'snippet': ''}
     
-    snippet = ''
-    if snippet_row and snippet_row['content']:
-        snippet = _extract_snippet(snippet_row['content'], query, max_length=100)
+    snippet = row['snippet'] or ''
+    if snippet and not _fts_enabled:
+        snippet = _extract_snippet(snippet, query, max_length=100)
     
-    return {'count': count, 'snippet': snippet}
+    return {'count': row['cnt'], 'snippet': snippet}
 
 
 def _extract_snippet(content: str, query: str, max_length: int = 100) -> str:
-    """Extract a snippet around the first match, with highlighting."""
+    """Extract a snippet around the first match (LIKE fallback without FTS5)."""
     query_lower = query.lower()
     content_lower = content.lower()
     
@@ -478,33 +852,6 @@ def _extract_snippet(content: str, query: str, max_length: int = 100) -> str:
     return snippet
 
 
-def _highlight_match(text: str, query: str) -> str:
-    """Return text with match location for highlighting (just returns text for now)."""
-    # Could add HTML highlighting here if needed
-    return text[:100] + ('...' if len(text) > 100 else '')
-
-
-def _count_search_matches(cursor: sqlite3.Cursor, query: str, search_content: bool) -> int:
-    """Count total matching sessions."""
-    search_pattern = f'%{query}%'
-    
-    if search_content:
-        cursor.execute('''
-            SELECT COUNT(DISTINCT id) as cnt FROM (
-                SELECT id FROM sessions WHERE title LIKE ?
-                UNION
-                SELECT DISTINCT sessionId as id FROM messages WHERE content LIKE ?
-            )
-        ''', (search_pattern, search_pattern))
-    else:
-        cursor.execute('''
-            SELECT COUNT(*) as cnt FROM sessions WHERE title LIKE ?
-        ''', (search_pattern,))
-    
-    row = cursor.fetchone()
-    return row['cnt'] if row else 0
-
-
 def update_session(
     session_id: str,
     title: Optional[str] = None,
@@ -513,8 +860,7 @@ def update_session(
     title_set_by_user: Optional[bool] = None
 ) -> Optional[Dict[str, Any]]:
     """Update session metadata."""
-    conn = get_connection()
-    try:
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         
         updates = []
@@ -543,20 +889,29 @@ def update_session(
         params.append(_ts_now())
         params.append(session_id)
         
+        if not _HAS_RETURNING:
+            cursor.execute(f'''
+                UPDATE sessions SET {', '.join(updates)} WHERE id = ?
+            ''', params)
+            conn.commit()
+            _invalidate(session_id)
+            return get_session(session_id)
+        
+        # Read the updated row back from the UPDATE itself
         cursor.execute(f'''
             UPDATE sessions SET {', '.join(updates)} WHERE id = ?
+            RETURNING *, {_RETURNING_STATS_SQL}
         ''', params)
+        row = cursor.fetchone()
         conn.commit()
+        _invalidate(session_id)
         
-        return get_session(session_id)
-    finally:
-        conn.close()
+        return _row_to_session(row) if row else None
 
 
 def delete_session(session_id: str) -> bool:
     """Delete a session and all its messages/events (cascade)."""
-    conn = get_connection()
-    try:
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         
         # Log deletion event before deleting (will cascade delete with session)
@@ -565,16 +920,49 @@ def delete_session(session_id: str) -> bool:
         # Delete session (messages and events cascade due to foreign keys)
         cursor.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
         conn.commit()
+        _invalidate(session_id)
         
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 
 # ============================================
 # Message CRUD Operations
 # ============================================
 
+_INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages (id, sessionId, role, content, ts, metaJson, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+# Same insert, skipped when the session does not exist (instead of an FK error);
+# takes the sessionId a second time as its last parameter
+_INSERT_SESSION_MESSAGE_SQL = '''
+    INSERT INTO messages (id, sessionId, role, content, ts, metaJson, status)
+    SELECT ?, ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)
+'''
+
+# Bump updatedAt after new messages; titles a "New Chat" session from a user message
+_TOUCH_SESSION_SQL = '''
+    UPDATE sessions SET
+        updatedAt = ?,
+        title = CASE
+            WHEN title = 'New Chat' AND ? = 'user'
+            THEN trim(substr(?, 1, 50), char(32, 9, 10, 13))
+                || CASE WHEN length(?) > 50 THEN '...' ELSE '' END
+            ELSE title
+        END
+    WHERE id = ?
+'''
+
+
+def _coerce_ts(value: Any, default: int) -> int:
+    """Message timestamp (ms) from an ISO string or int; default when missing."""
+    if isinstance(value, str):
+        return _iso_to_ts(value)
+    return default if value is None else value
+
+
 def add_message(
     session_id: str,
     role: str,
@@ -584,33 +972,24 @@ def add_message(
     meta: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """Add a message to a session."""
-    msg_id = message_id or str(uuid.uuid4())
+    msg_id = message_id or _new_id()
     msg_ts = ts or _ts_now()
     meta_json = json.dumps(meta) if meta else None
+    status = meta.get('status') if meta else None
     
-    conn = get_connection()
-    try:
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         
         # Insert message
-        cursor.execute('''
-            INSERT INTO messages (id, sessionId, role, content, ts, metaJson)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (msg_id, session_id, role, content, msg_ts, meta_json))
+        cursor.execute(_INSERT_MESSAGE_SQL,
+                       (msg_id, session_id, role, content, msg_ts, meta_json, status))
         
-        # Update session updatedAt
-        cursor.execute('UPDATE sessions SET updatedAt = ? WHERE id = ?', (msg_ts, session_id))
-        
-        # Auto-generate title from first user message if title is "New Chat"
-        cursor.execute('SELECT title FROM sessions WHERE id = ?', (session_id,))
-        row = cursor.fetchone()
-        if row and row['title'] == 'New Chat' and role == 'user':
-            auto_title = content[:50].strip()
-            if len(content) > 50:
-                auto_title += '...'
-            cursor.execute('UPDATE sessions SET title = ? WHERE id = ?', (auto_title, session_id))
+        # Update session updatedAt, and auto-generate the title from the first
+        # user message while it is still "New Chat" (same transaction, one commit)
+        cursor.execute(_TOUCH_SESSION_SQL, (msg_ts, role, content, content, session_id))
         
         conn.commit()
+        _invalidate(session_id)
         
         return {
             'id': msg_id,
@@ -618,86 +997,164 @@ def add_message(
             'role': role,
             'content': content,
             'ts': _ts_to_iso(msg_ts),
-            'status': meta.get('status', 'complete') if meta else 'complete'
+            'status': status or 'complete'
         }
-    finally:
-        conn.close()
 
 
-def get_messages(session_id: str) -> List[Dict[str, Any]]:
-    """Get all messages for a session."""
-    conn = get_connection()
-    try:
+def add_messages(session_id: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Add several messages to a session in one transaction.
+    
+    Args:
+        session_id: Session to append to
+        messages: Message dicts: { role, content, id?, ts?, status? }
+    
+    Returns:
+        The updated session, or None if it does not exist
+    """
+    if not messages:
+        return get_session(session_id)
+    
+    now = _ts_now()
+    rows = [(
+        msg.get('id') or _new_id(),
+        session_id,
+        msg.get('role', 'user'),
+        msg.get('content', ''),
+        _coerce_ts(msg.get('ts'), now),
+        json.dumps({'status': msg['status']}) if 'status' in msg else None,
+        msg.get('status'),
+        session_id,
+    ) for msg in messages]
+    
+    # Title candidate: the first user message, as if appended one at a time
+    first = next((row for row in rows if row[2] == 'user'), rows[0])
+    touch_params = (rows[-1][4], first[2], first[3], first[3], session_id)
+    
+    with borrow(write=True) as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_INSERT_SESSION_MESSAGE_SQL, rows)
+        
+        if not _HAS_RETURNING:
+            cursor.execute(_TOUCH_SESSION_SQL, touch_params)
+            if cursor.rowcount == 0:
+                return None  # No such session; nothing was inserted
+            conn.commit()
+            _invalidate(session_id)
+            return get_session(session_id)
+        
+        # The updated session (with its new stats) comes back from the UPDATE
+        cursor.execute(f'{_TOUCH_SESSION_SQL} RETURNING *, {_RETURNING_STATS_SQL}', touch_params)
+        row = cursor.fetchone()
+        if row is None:
+            return None  # No such session; nothing was inserted
+        conn.commit()
+        _invalidate(session_id)
+        
+        return _row_to_session(row)
+
+
+def _iter_messages(session_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a session's messages in order, one row at a time.
+    
+    The pooled connection is held until the generator is exhausted or closed.
+    """
+    with borrow() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM messages 
             WHERE sessionId = ? 
             ORDER BY ts ASC
         ''', (session_id,))
+        for row in cursor:
+            yield _row_to_message(row)
+
+
+def get_messages(session_id: str) -> List[Dict[str, Any]]:
+    """Get all messages for a session."""
+    return list(_iter_messages(session_id))
+
+
+def get_messages_page(
+    session_id: str,
+    limit: int = 200,
+    before_ts: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get the most recent messages of a session, oldest first.
+    
+    Args:
+        session_id: Session to read
+        limit: Maximum messages to return
+        before_ts: Only messages older than this timestamp (ms), to page back
+            from the oldest message already shown
+    """
+    with borrow() as conn:
+        cursor = conn.cursor()
+        if before_ts is None:
+            cursor.execute('''
+                SELECT * FROM messages WHERE sessionId = ?
+                ORDER BY ts DESC LIMIT ?
+            ''', (session_id, limit))
+        else:
+            cursor.execute('''
+                SELECT * FROM messages WHERE sessionId = ? AND ts < ?
+                ORDER BY ts DESC LIMIT ?
+            ''', (session_id, before_ts, limit))
         rows = cursor.fetchall()
         
-        return [_row_to_message(row) for row in rows]
-    finally:
-        conn.close()
+        # Reverse to get chronological order
+        return [_row_to_message(row) for row in reversed(rows)]
 
 
 def clear_messages(session_id: str) -> bool:
     """Clear all messages from a session."""
-    conn = get_connection()
-    try:
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
         cursor.execute('DELETE FROM messages WHERE sessionId = ?', (session_id,))
         cursor.execute('UPDATE sessions SET updatedAt = ?, summary = NULL WHERE id = ?',
                        (_ts_now(), session_id))
         conn.commit()
+        _invalidate(session_id)
         return True
-    finally:
-        conn.close()
 
 
 def save_session_messages(session_id: str, messages: List[Dict[str, Any]]) -> bool:
-    """Save/replace all messages for a session (batch operation)."""
-    conn = get_connection()
-    try:
+    """
+    Save/replace all messages for a session (batch operation).
+    
+    The delete, inserts and updatedAt change share one transaction (opened
+    implicitly by the DELETE), so the save is atomic and commits once.
+    """
+    now = _ts_now()
+    dumps = json.dumps
+    
+    # Build every row before taking the write lock; metaJson stays NULL
+    # unless the message carries a status
+    rows = [(
+        msg.get('id') or _new_id(),
+        session_id,
+        msg.get('role', 'user'),
+        msg.get('content', ''),
+        _coerce_ts(msg.get('ts'), now),
+        dumps({'status': msg['status']}) if 'status' in msg else None,
+        msg.get('status')
+    ) for msg in messages]
+    
+    with borrow(write=True) as conn:
         cursor = conn.cursor()
-        now = _ts_now()
         
-        # Clear existing messages
+        # Clear existing messages, then insert all rows with one prepared statement
         cursor.execute('DELETE FROM messages WHERE sessionId = ?', (session_id,))
-        
-        # Insert all new messages
-        for msg in messages:
-            msg_id = msg.get('id', str(uuid.uuid4()))
-            msg_ts = msg.get('ts')
-            if isinstance(msg_ts, str):
-                msg_ts = _iso_to_ts(msg_ts)
-            elif msg_ts is None:
-                msg_ts = now
-            
-            meta = {}
-            if 'status' in msg:
-                meta['status'] = msg['status']
-            meta_json = json.dumps(meta) if meta else None
-            
-            cursor.execute('''
-                INSERT INTO messages (id, sessionId, role, content, ts, metaJson)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                msg_id,
-                session_id,
-                msg.get('role', 'user'),
-                msg.get('content', ''),
-                msg_ts,
-                meta_json
-            ))
+        cursor.executemany(_INSERT_MESSAGE_SQL, rows)
         
         # Update session updatedAt
         cursor.execute('UPDATE sessions SET updatedAt = ? WHERE id = ?', (now, session_id))
         
         conn.commit()
+        _invalidate(session_id)
         return True
-    finally:
-        conn.close()
 
 
 # ============================================
@@ -707,7 +1164,7 @@ def save_session_messages(session_id: str, messages: List[Dict[str, Any]]) -> bo
 def _log_event_internal(cursor: sqlite3.Cursor, session_id: str, event_type: str, 
                         data: Optional[Dict[str, Any]] = None) -> str:
     """Internal: Log an event using existing cursor (no commit)."""
-    event_id = str(uuid.uuid4())
+    event_id = _new_id()
     now = _ts_now()
     data_json = json.dumps(data) if data else None
     
@@ -721,70 +1178,132 @@ def _log_event_internal(cursor: sqlite3.Cursor, session_id: str, event_type: str
         return ''
 
 
+# Pending (id, sessionId, type, ts, dataJson) rows from log_event()
+_event_buffer: deque = deque()
+_event_wake = threading.Event()
+_event_stop = threading.Event()
+_event_flusher: Optional[threading.Thread] = None
+
+# Events for sessions that no longer exist are dropped, not FK errors
+_INSERT_EVENT_SQL = '''
+    INSERT INTO events (id, sessionId, type, ts, dataJson)
+    SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)
+'''
+
+
 def log_event(session_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> str:
-    """Log an event for a session."""
-    conn = get_connection()
+    """
+    Log an event for a session.
+    
+    The event is queued and written by the background flusher within
+    EVENT_FLUSH_INTERVAL seconds (sooner once EVENT_BATCH_SIZE are pending).
+    """
+    event_id = _new_id()
+    data_json = json.dumps(data) if data else None
+    _event_buffer.append((event_id, session_id, event_type, _ts_now(), data_json))
+    if len(_event_buffer) >= EVENT_BATCH_SIZE:
+        _event_wake.set()
+    return event_id
+
+
+def flush_events() -> int:
+    """Write all buffered events in one transaction. Returns the number of events taken."""
+    rows = []
+    while _event_buffer:
+        try:
+            row = _event_buffer.popleft()
+        except IndexError:
+            break
+        rows.append(row + (row[1],))
+    if not rows:
+        return 0
+    
     try:
-        cursor = conn.cursor()
-        event_id = _log_event_internal(cursor, session_id, event_type, data)
-        conn.commit()
-        return event_id
+        with borrow(write=True) as conn:
+            conn.executemany(_INSERT_EVENT_SQL, rows)
+            conn.commit()
     except Exception:
         # Events are non-critical, don't fail on errors
-        return ''
-    finally:
-        conn.close()
+        pass
+    return len(rows)
+
+
+def _flush_events_forever(stop: threading.Event):
+    while not stop.is_set():
+        _event_wake.wait(EVENT_FLUSH_INTERVAL)
+        _event_wake.clear()
+        flush_events()
+
+
+def _start_event_flusher():
+    """Start the background event flusher (one at a time, until close_pool())."""
+    global _event_flusher, _event_stop
+    with _pool_lock:
+        if _event_flusher is not None and _event_flusher.is_alive():
+            return
+        _event_stop = threading.Event()
+        _event_flusher = threading.Thread(
+            target=_flush_events_forever, args=(_event_stop,),
+            name='chat-history-events', daemon=True
+        )
+        _event_flusher.start()
 
 
-def get_events(session_id: str, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get events for a session, optionally filtered by type."""
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        
+def _stop_event_flusher():
+    """Stop the background event flusher and wait for its last flush."""
+    global _event_flusher
+    with _pool_lock:
+        flusher, _event_flusher = _event_flusher, None
+        _event_stop.set()
+    _event_wake.set()
+    # Join outside _pool_lock: the flusher's last flush borrows from the pool
+    if flusher is not None and flusher is not threading.current_thread():
+        flusher.join(timeout=5.0)
+
+
+atexit.register(flush_events)
+
+
+def _event_rows(columns: str, session_id: str, event_type: Optional[str]) -> List[sqlite3.Row]:
+    flush_events()
+    with borrow() as conn:
         if event_type:
-            cursor.execute('''
-                SELECT * FROM events WHERE sessionId = ? AND type = ? ORDER BY ts ASC
-            ''', (session_id, event_type))
-        else:
-            cursor.execute('''
-                SELECT * FROM events WHERE sessionId = ? ORDER BY ts ASC
-            ''', (session_id,))
-        
-        rows = cursor.fetchall()
-        return [{
-            'id': row['id'],
-            'sessionId': row['sessionId'],
-            'type': row['type'],
-            'ts': _ts_to_iso(row['ts']),
-            'data': json.loads(row['dataJson']) if row['dataJson'] else None
-        } for row in rows]
-    finally:
-        conn.close()
+            return conn.execute(f'''
+                SELECT {columns} FROM events WHERE sessionId = ? AND type = ? ORDER BY ts ASC
+            ''', (session_id, event_type)).fetchall()
+        return conn.execute(f'''
+            SELECT {columns} FROM events WHERE sessionId = ? ORDER BY ts ASC
+        ''', (session_id,)).fetchall()
 
 
-# ============================================
-# Helper Functions
-# ============================================
+def _parse_event_data(data_json: Optional[str]) -> Optional[Any]:
+    if not data_json or data_json == 'null':
+        return None
+    return json.loads(data_json)
 
-def _get_message_count(cursor: sqlite3.Cursor, session_id: str) -> int:
-    """Get message count for a session."""
-    cursor.execute('SELECT COUNT(*) as cnt FROM messages WHERE sessionId = ?', (session_id,))
-    row = cursor.fetchone()
-    return row['cnt'] if row else 0
+
+def get_events(session_id: str, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get events for a session, optionally filtered by type."""
+    rows = _event_rows('id, sessionId, type, ts, dataJson', session_id, event_type)
+    return [{
+        'id': row['id'],
+        'sessionId': row['sessionId'],
+        'type': row['type'],
+        'ts': _ts_to_iso(row['ts']),
+        'data': _parse_event_data(row['dataJson'])
+    } for row in rows]
 
 
-def _get_preview(cursor: sqlite3.Cursor, session_id: str) -> str:
-    """Get preview text (last message content, truncated)."""
-    cursor.execute('''
-        SELECT content FROM messages WHERE sessionId = ? ORDER BY ts DESC LIMIT 1
-    ''', (session_id,))
-    row = cursor.fetchone()
-    if row and row['content']:
-        return row['content'][:100]
-    return ''
+def get_events_summary(session_id: str, event_type: Optional[str] = None) -> List[Tuple[str, str, str]]:
+    """Get (id, type, ts) for a session's events without reading or parsing their data."""
+    rows = _event_rows('id, type, ts', session_id, event_type)
+    return [(row['id'], row['type'], _ts_to_iso(row['ts'])) for row in rows]
 
 
+# ============================================
+# Helper Functions
+# ============================================
+
 def _make_session_response(
     session_id: str,
     title: str,
@@ -810,8 +1329,8 @@ def _make_session_response(
     }
 
 
-def _row_to_session(row: sqlite3.Row, cursor: sqlite3.Cursor) -> Dict[str, Any]:
-    """Convert a database row to a session dict."""
+def _row_to_session(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a database row (selected with _SESSION_STATS_SQL) to a session dict."""
     session_id = row['id']
     # Handle titleSetByUser column (may not exist in old databases)
     try:
@@ -826,22 +1345,21 @@ def _row_to_session(row: sqlite3.Row, cursor: sqlite3.Cursor) -> Dict[str, Any]:
         updated_at=row['updatedAt'],
         pinned=bool(row['pinned']),
         summary=row['summary'],
-        message_count=_get_message_count(cursor, session_id),
-        preview=_get_preview(cursor, session_id),
+        message_count=row['messageCount'],
+        preview=row['preview'] or '',
         title_set_by_user=title_set_by_user
     )
 
 
 def _row_to_message(row: sqlite3.Row) -> Dict[str, Any]:
-    """Convert a database row to a message dict."""
-    meta = json.loads(row['metaJson']) if row['metaJson'] else {}
+    """Convert a database row to a message dict (metaJson is not parsed)."""
     return {
         'id': row['id'],
         'sessionId': row['sessionId'],
         'role': row['role'],
         'content': row['content'],
         'ts': _ts_to_iso(row['ts']),
-        'status': meta.get('status', 'complete')
+        'status': row['status'] or 'complete'
     }
 
 
@@ -850,6 +1368,15 @@ def _row_to_message(row: sqlite3.Row) -> Dict[str, Any]:
 # Strict request/response format with requestId correlation
 # ============================================
 
+# Suffix keeping fallback request ids unique within a millisecond
+_request_counter = itertools.count()
+
+
+def _fallback_request_id() -> str:
+    """Request id for requests that arrive without one."""
+    return f'req_{time.time_ns() // 1_000_000}_{next(_request_counter)}'
+
+
 class ChatHistoryHandler:
     """
     Handles chat history JSON protocol messages (v1.1.0).
@@ -884,7 +1411,9 @@ class ChatHistoryHandler:
         Handle a chat history action.
         Returns a response dict with appropriate response action type.
         """
-        request_id = data.get('requestId', f'req_{_ts_now()}_0')
+        request_id = data.get('requestId')
+        if request_id is None:
+            request_id = _fallback_request_id()
         payload = data.get('payload', {})
         
         try:
@@ -929,31 +1458,21 @@ class ChatHistoryHandler:
     
     def _dispatch(self, action: str, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         """Dispatch action to appropriate handler. Returns (response_action, result)."""
-        handlers = {
-            'history_list': self._handle_list,
-            'history_create': self._handle_create,
-            'history_load': self._handle_load,
-            'history_append': self._handle_append,
-            'history_delete': self._handle_delete,
-            'history_rename': self._handle_rename,
-            'history_pin': self._handle_pin,
-            'history_search': self._handle_search,
-        }
-        
-        handler = handlers.get(action)
+        handler = self._HANDLERS.get(action)
         if not handler:
             raise ValueError(f"Unknown action: {action}")
         
-        return handler(payload)
+        return handler(self, payload)
     
     def _handle_list(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         """List all sessions -> history_list_result."""
-        sessions = list_sessions(
+        result = list_sessions(
             include_archived=payload.get('includeArchived', False),
             limit=payload.get('limit', 50),
-            offset=payload.get('offset', 0)
+            offset=payload.get('offset', 0),
+            cursor=payload.get('cursor')
         )
-        return ('history_list_result', {'sessions': sessions})
+        return ('history_list_result', result)
     
     def _handle_create(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         """Create a new session -> history_create_result."""
@@ -982,42 +1501,21 @@ class ChatHistoryHandler:
         })
     
     def _handle_append(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        """Append a message to a session -> history_ok."""
+        """Append a message (or a messages array) to a session -> history_ok."""
         session_id = payload.get('sessionId')
-        message = payload.get('message', {})
+        messages = payload.get('messages') or []
+        if not messages and payload.get('message'):
+            messages = [payload['message']]
         
         if not session_id:
             raise ValueError("sessionId is required")
-        if not message:
+        if not messages:
             raise ValueError("message is required")
         
-        # Ensure session exists
-        session = get_session(session_id)
-        if not session:
+        # Add the messages; the updated session comes back from the same write
+        session = add_messages(session_id, messages)
+        if session is None:
             raise KeyError(f"Session not found: {session_id}")
-        
-        # Parse message timestamp
-        msg_ts = message.get('ts')
-        if isinstance(msg_ts, str):
-            msg_ts = _iso_to_ts(msg_ts)
-        
-        # Build meta from status
-        meta = None
-        if 'status' in message:
-            meta = {'status': message['status']}
-        
-        # Add the message
-        add_message(
-            session_id=session_id,
-            role=message.get('role', 'user'),
-            content=message.get('content', ''),
-            message_id=message.get('id'),
-            ts=msg_ts,
-            meta=meta
-        )
-        
-        # Return updated session
-        session = get_session(session_id)
         return ('history_ok', {'session': session})
     
     def _handle_delete(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
@@ -1070,17 +1568,36 @@ class ChatHistoryHandler:
         return ('history_ok', {'session': session})
     
     def _handle_search(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        """Search sessions by title/content -> history_list_result."""
+        """Search sessions by title/content -> history_list_result (with snippets)."""
         query = payload.get('query', '')
         if not query:
             raise ValueError("query is required")
         
-        sessions = list_sessions(
-            search_query=query,
-            include_archived=payload.get('includeArchived', False),
-            limit=payload.get('limit', 50)
+        cursor = payload.get('cursor')
+        cursor_ts, cursor_id = _parse_cursor(cursor) if cursor else (None, None)
+        
+        # FTS5 MATCH + snippet() when available (see _content_match)
+        result = search_sessions(
+            query=query,
+            limit=payload.get('limit', 50),
+            cursor_ts=cursor_ts,
+            cursor_id=cursor_id,
+            search_content=payload.get('searchContent', True),
+            include_archived=payload.get('includeArchived', False)
         )
-        return ('history_list_result', {'sessions': sessions})
+        return ('history_list_result', result)
+    
+    # Action -> unbound handler, built once with the class
+    _HANDLERS = {
+        'history_list': _handle_list,
+        'history_create': _handle_create,
+        'history_load': _handle_load,
+        'history_append': _handle_append,
+        'history_delete': _handle_delete,
+        'history_rename': _handle_rename,
+        'history_pin': _handle_pin,
+        'history_search': _handle_search,
+    }
 
 
 # ============================================
@@ -1089,13 +1606,17 @@ class ChatHistoryHandler:
 
 # Global handler instance
 _handler: Optional[ChatHistoryHandler] = None
+_singleton_lock = threading.Lock()
 
 
 def get_handler() -> ChatHistoryHandler:
     """Get or create the singleton handler instance."""
     global _handler
     if _handler is None:
-        _handler = ChatHistoryHandler()
+        with _singleton_lock:
+            # Re-check under the lock: another thread may have created it
+            if _handler is None:
+                _handler = ChatHistoryHandler()
     return _handler
 
 
@@ -20,54 +20,79 @@ Action Routing:
 """
 
 import json
+import threading
 import time
-from typing import Dict, Any, Callable, Optional
-from datetime import datetime
+from typing import Dict, Any, Callable, Final, Optional, Tuple
 
-# Import service layer
+# msgspec encodes response envelopes far faster than json, but is not bundled
+# with Fusion's Python
 try:
-    from . import history_service
-    from .history_service import HistoryService, get_service
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
 except ImportError:
-    # Fallback for direct execution
+    orjson = None
+
+# Import service layer
+if __package__:
+    from . import history_service
+    from .history_service import HistoryService, ServiceResult, get_service
+    from .chat_history import _fallback_request_id
+else:
+    # Direct execution
     import history_service
-    from history_service import HistoryService, get_service
+    from history_service import HistoryService, ServiceResult, get_service
+    from chat_history import _fallback_request_id
 
 
 # ============================================
 # Protocol Constants
 # ============================================
 
-PROTOCOL_VERSION = '1.1.0'
-
-# Action to response action mapping
-ACTION_RESPONSE_MAP = {
-    'history_list': 'history_list_result',
-    'history_create': 'history_create_result',
-    'history_load': 'history_load_result',
-    'history_rename': 'history_ok',
-    'history_delete': 'history_ok',
-    'history_pin': 'history_ok',
-    'history_append': 'history_ok',
-    'history_search': 'history_list_result',
-}
+PROTOCOL_VERSION: Final[str] = '1.1.0'
 
 
 # ============================================
 # Response Helpers
 # ============================================
 
+if msgspec is not None:
+    class Envelope(msgspec.Struct):
+        """Response envelope; fields encode in protocol order."""
+        action: str
+        v: str
+        requestId: str
+        ts: str
+        payload: Any
+
+    _ENCODER = msgspec.json.Encoder()
+
+
+# Last timestamp handed out, reused until the clock moves to the next millisecond
+_last_ms = 0
+_last_iso = ''
+
+
 def _ts_now_iso() -> str:
-    """Get current timestamp in ISO 8601 format."""
-    return datetime.utcnow().isoformat() + 'Z'
+    """Get current timestamp in ISO 8601 format (UTC, millisecond precision)."""
+    global _last_ms, _last_iso
+    ms = time.time_ns() // 1_000_000
+    if ms != _last_ms:
+        seconds, millis = divmod(ms, 1000)
+        _last_iso = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds)) + f'.{millis:03d}Z'
+        _last_ms = ms
+    return _last_iso
 
 
-def _make_success_response(
+def _make_response(
     response_action: str,
     request_id: str,
     payload: Dict[str, Any]
 ) -> Dict[str, Any]:
-    """Create a success response envelope."""
+    """Create a response envelope (history_error for failures)."""
     return {
         'action': response_action,
         'v': PROTOCOL_VERSION,
@@ -77,114 +102,108 @@ def _make_success_response(
     }
 
 
-def _make_error_response(
-    request_id: str,
+def _error_payload(
     code: str,
     message: str,
     details: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
-    """Create an error response envelope."""
+    """Build a history_error payload."""
     payload = {
         'code': code,
         'message': message
     }
     if details:
         payload['details'] = details
-    
-    return {
-        'action': 'history_error',
-        'v': PROTOCOL_VERSION,
-        'requestId': request_id,
-        'ts': _ts_now_iso(),
-        'payload': payload
-    }
+    return payload
+
+
+def _dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+
+# Response action -> encoded '{"action":...,"v":...,' (the fields fixed per action)
+_envelope_heads: Dict[str, str] = {}
+
+
+def _envelope_head(response_action: str) -> str:
+    head = _envelope_heads.get(response_action)
+    if head is None:
+        head = _envelope_heads[response_action] = (
+            f'{{"action":{_dumps(response_action)},"v":{_dumps(PROTOCOL_VERSION)},'
+        )
+    return head
+
+
+def _encode_response(response_action: str, request_id: str, payload: Any) -> str:
+    """Encode a response envelope straight to JSON text for sendInfoToHTML."""
+    if msgspec is not None:
+        envelope = Envelope(response_action, PROTOCOL_VERSION, request_id, _ts_now_iso(), payload)
+        return _ENCODER.encode(envelope).decode('utf-8')
+    # Only requestId and payload need encoding; the timestamp has no characters to escape
+    return (
+        f'{_envelope_head(response_action)}"requestId":{_dumps(request_id)},'
+        f'"ts":"{_ts_now_iso()}","payload":{_dumps(payload)}}}'
+    )
 
 
 # ============================================
 # Action Handlers
 # ============================================
 
-def _handle_list(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_list(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_list action."""
-    result = service.list_sessions(
+    return service.list_sessions(
         limit=payload.get('limit'),
         cursor=payload.get('cursor')
     )
-    
-    if result.success:
-        return result.data
-    raise ValueError(result.error_message)
 
 
-def _handle_create(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_create(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_create action."""
-    result = service.create_session(
+    return service.create_session(
         title=payload.get('title')
     )
-    
-    if result.success:
-        return result.data
-    raise ValueError(result.error_message)
 
 
-def _handle_load(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_load(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_load action."""
-    result = service.load_session(
+    return service.load_session(
         session_id=payload.get('sessionId', ''),
         limit_messages=payload.get('limitMessages')
     )
-    
-    if result.success:
-        return result.data
-    
-    # Convert error code to appropriate exception
-    if result.error_code == 'NOT_FOUND':
-        raise KeyError(result.error_message)
-    raise ValueError(result.error_message)
 
 
-def _handle_rename(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_rename(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_rename action."""
-    result = service.rename_session(
+    return service.rename_session(
         session_id=payload.get('sessionId', ''),
         title=payload.get('title', '')
     )
-    
-    if result.success:
-        return result.data
-    
-    if result.error_code == 'NOT_FOUND':
-        raise KeyError(result.error_message)
-    raise ValueError(result.error_message)
 
 
-def _handle_delete(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_delete(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_delete action."""
-    result = service.delete_session(
+    return service.delete_session(
         session_id=payload.get('sessionId', '')
     )
-    
-    if result.success:
-        return result.data
-    raise ValueError(result.error_message)
 
 
-def _handle_pin(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_pin(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_pin action."""
-    result = service.pin_session(
+    return service.pin_session(
         session_id=payload.get('sessionId', ''),
         pinned=payload.get('pinned', True)
     )
-    
-    if result.success:
-        return result.data
-    
-    if result.error_code == 'NOT_FOUND':
-        raise KeyError(result.error_message)
-    raise ValueError(result.error_message)
 
 
-def _handle_append(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _append_ignored() -> ServiceResult:
+    """Result for appends the UI should treat as done (it keeps messages locally)."""
+    return ServiceResult(success=True, data={'session': None, 'messageCount': 0})
+
+
+def _handle_append(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """Handle history_append action."""
     # Support single message (protocol spec) or messages array
     messages = payload.get('messages', [])
@@ -193,38 +212,21 @@ def _handle_append(service: HistoryService, payload: Dict[str, Any]) -> Dict[str
     if 'message' in payload and not messages:
         messages = [payload['message']]
     
-    session_id = payload.get('sessionId', '')
-    
-    # If no sessionId provided, silently return success (frontend handles locally)
-    # This prevents errors when session hasn't been created yet
-    if not session_id:
-        return {
-            "session": None,
-            "messageCount": 0
-        }
-    
+    # Appends without a sessionId are answered by HistoryHandlers._dispatch
     result = service.append_messages(
-        session_id=session_id,
+        session_id=payload['sessionId'],
         messages=messages,
         events=payload.get('events')
     )
     
-    if result.success:
-        return result.data
-    
-    if result.error_code == 'NOT_FOUND':
-        raise KeyError(result.error_message)
     # For any validation errors, silently ignore to prevent UI popups
     # Messages are already stored locally in frontend
     if result.error_code == 'INVALID_PAYLOAD':
-        return {
-            "session": None,
-            "messageCount": 0
-        }
-    raise ValueError(result.error_message)
+        return _append_ignored()
+    return result
 
 
-def _handle_search(service: HistoryService, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _handle_search(service: HistoryService, payload: Dict[str, Any]) -> ServiceResult:
     """
     Handle history_search action.
     
@@ -243,30 +245,25 @@ def _handle_search(service: HistoryService, payload: Dict[str, Any]) -> Dict[str
         nextCursor: pagination cursor or null
         totalMatches: total number of matching sessions
     """
-    result = service.search_sessions(
+    return service.search_sessions(
         query=payload.get('query', ''),
         limit=payload.get('limit'),
         cursor=payload.get('cursor'),
         search_content=payload.get('searchContent', True),
         include_archived=payload.get('includeArchived', False)
     )
-    
-    if result.success:
-        return result.data
-    
-    raise ValueError(result.error_message)
-
-
-# Handler dispatch table
-ACTION_HANDLERS: Dict[str, Callable[[HistoryService, Dict[str, Any]], Dict[str, Any]]] = {
-    'history_list': _handle_list,
-    'history_create': _handle_create,
-    'history_load': _handle_load,
-    'history_rename': _handle_rename,
-    'history_delete': _handle_delete,
-    'history_pin': _handle_pin,
-    'history_append': _handle_append,
-    'history_search': _handle_search,
+
+
+# Handler dispatch table: action -> (handler, response action)
+ACTION_TABLE: Dict[str, Tuple[Callable[[HistoryService, Dict[str, Any]], ServiceResult], str]] = {
+    'history_list': (_handle_list, 'history_list_result'),
+    'history_create': (_handle_create, 'history_create_result'),
+    'history_load': (_handle_load, 'history_load_result'),
+    'history_rename': (_handle_rename, 'history_ok'),
+    'history_delete': (_handle_delete, 'history_ok'),
+    'history_pin': (_handle_pin, 'history_ok'),
+    'history_append': (_handle_append, 'history_ok'),
+    'history_search': (_handle_search, 'history_list_result'),
 }
 
 
@@ -290,7 +287,54 @@ class HistoryHandlers:
     
     def can_handle(self, action: str) -> bool:
         """Check if this handler can process the given action."""
-        return action in ACTION_HANDLERS
+        return action in ACTION_TABLE
+    
+    def _dispatch(self, action: str, data: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """Run the handler for action. Returns (response_action, request_id, payload)."""
+        # Extract request ID with fallback
+        request_id = data.get('requestId')
+        if request_id is None:
+            request_id = _fallback_request_id()
+        payload = data.get('payload')
+        if payload is None:
+            payload = {}
+        
+        # Appends before the session exists are kept by the frontend alone; answer
+        # them here so token streaming skips the handler and service entirely
+        if action == 'history_append' and isinstance(payload, dict) and not payload.get('sessionId'):
+            return 'history_ok', request_id, {'session': None, 'messageCount': 0}
+        
+        # Get handler and expected response action
+        entry = ACTION_TABLE.get(action)
+        if entry is None:
+            return 'history_error', request_id, _error_payload(
+                'INVALID_ACTION',
+                f"Unknown action: {action}"
+            )
+        handler, response_action = entry
+        
+        # Handlers read fields with payload.get(); anything but an object is malformed
+        if not isinstance(payload, dict):
+            return 'history_error', request_id, _error_payload(
+                'INVALID_PAYLOAD',
+                "payload must be an object"
+            )
+        
+        try:
+            result = handler(self._service, payload)
+        except Exception as e:
+            # Unexpected errors - never crash
+            return 'history_error', request_id, _error_payload(
+                'UNKNOWN',
+                f"Internal error: {str(e)}"
+            )
+        
+        if result.success:
+            return response_action, request_id, result.data
+        return 'history_error', request_id, _error_payload(
+            result.error_code or 'UNKNOWN',
+            result.error_message or ''
+        )
     
     def handle(self, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -310,55 +354,17 @@ class HistoryHandlers:
                 'payload': { ... }
             }
         """
-        # Extract request ID with fallback
-        request_id = data.get('requestId', f'req_{int(time.time() * 1000)}_0')
-        payload = data.get('payload', {})
-        
-        # Get handler for action
-        handler = ACTION_HANDLERS.get(action)
-        if not handler:
-            return _make_error_response(
-                request_id,
-                'INVALID_ACTION',
-                f"Unknown action: {action}"
-            )
-        
-        # Get expected response action
-        response_action = ACTION_RESPONSE_MAP.get(action, 'history_ok')
+        return _make_response(*self._dispatch(action, data))
+    
+    def handle_json(self, action: str, data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Handle a history action and return the response already encoded.
         
-        try:
-            # Execute handler
-            result_payload = handler(self._service, payload)
-            
-            return _make_success_response(
-                response_action,
-                request_id,
-                result_payload
-            )
-            
-        except KeyError as e:
-            # Not found errors
-            return _make_error_response(
-                request_id,
-                'NOT_FOUND',
-                str(e)
-            )
-            
-        except ValueError as e:
-            # Validation errors
-            return _make_error_response(
-                request_id,
-                'INVALID_PAYLOAD',
-                str(e)
-            )
-            
-        except Exception as e:
-            # Unexpected errors - never crash
-            return _make_error_response(
-                request_id,
-                'UNKNOWN',
-                f"Internal error: {str(e)}"
-            )
+        Returns:
+            (response_action, response_json) for send_json_to_palette
+        """
+        response_action, request_id, payload = self._dispatch(action, data)
+        return response_action, _encode_response(response_action, request_id, payload)
 
 
 # ============================================
@@ -367,13 +373,16 @@ class HistoryHandlers:
 
 # Global handler instance
 _handlers: Optional[HistoryHandlers] = None
+_singleton_lock = threading.Lock()
 
 
 def get_handlers() -> HistoryHandlers:
     """Get or create the singleton handler instance."""
     global _handlers
     if _handlers is None:
-        _handlers = HistoryHandlers()
+        with _singleton_lock:
+            if _handlers is None:
+                _handlers = HistoryHandlers()
     return _handlers
 
 
@@ -399,6 +408,14 @@ def handle_history_action(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
     return get_handlers().handle(action, data)
 
 
+def handle_history_action_json(action: str, data: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Like handle_history_action(), but returns (response_action, response_json)
+    with the envelope encoded in one pass (msgspec when installed).
+    """
+    return get_handlers().handle_json(action, data)
+
+
 def is_history_action(action: str) -> bool:
     """Check if an action should be handled by history handlers."""
-    return action.startswith('history_') and action in ACTION_HANDLERS
+    return action.startswith('history_') and action in ACTION_TABLE
@@ -14,8 +14,8 @@ Provides:
 - Protocol v1.1.0 compliant responses
 """
 
-import re
 import json
+import threading
 from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 
@@ -38,12 +38,10 @@ DEFAULT_MESSAGES_PER_LOAD = 200
 DEFAULT_TITLE = "New chat"
 MAX_SEARCH_QUERY_LENGTH = 200
 MIN_SEARCH_QUERY_LENGTH = 1
+LOAD_CACHE_SIZE = 32  # Sessions whose loaded messages are kept in memory
 
-# UUID regex pattern
-UUID_PATTERN = re.compile(
-    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
-    re.IGNORECASE
-)
+# Characters allowed in the hex groups of a UUID
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
 
 
 # ============================================
@@ -78,13 +76,22 @@ class ServiceResult:
 # Validation Helpers
 # ============================================
 
+def _is_uuid(value: str) -> bool:
+    """Check for the 8-4-4-4-12 hex UUID form (fixed layout, so no regex needed)."""
+    return (
+        len(value) == 36
+        and value[8] == value[13] == value[18] == value[23] == '-'
+        and _HEX_DIGITS.issuperset(value[:8] + value[9:13] + value[14:18] + value[19:23] + value[24:])
+    )
+
+
 def _validate_uuid(value: Any, field_name: str) -> Tuple[bool, Optional[str]]:
     """Validate a UUID string. Returns (is_valid, error_message)."""
     if value is None:
         return False, f"{field_name} is required"
     if not isinstance(value, str):
         return False, f"{field_name} must be a string"
-    if not UUID_PATTERN.match(value):
+    if not _is_uuid(value):
         return False, f"{field_name} must be a valid UUID"
     return True, None
 
@@ -286,11 +293,6 @@ def _validate_event(evt: Any, index: int) -> Tuple[Optional[Dict[str, Any]], Opt
 # Cursor Utilities
 # ============================================
 
-def _encode_cursor(updated_at: int, session_id: str) -> str:
-    """Encode pagination cursor from updatedAt + id."""
-    return f"{updated_at}:{session_id}"
-
-
 def _decode_cursor(cursor: str) -> Tuple[Optional[int], Optional[str]]:
     """Decode pagination cursor to (updatedAt, id). Returns (None, None) on invalid."""
     if not cursor or not isinstance(cursor, str):
@@ -303,7 +305,7 @@ def _decode_cursor(cursor: str) -> Tuple[Optional[int], Optional[str]]:
     try:
         updated_at = int(parts[0])
         session_id = parts[1]
-        if UUID_PATTERN.match(session_id):
+        if _is_uuid(session_id):
             return updated_at, session_id
     except (ValueError, TypeError):
         pass
@@ -311,6 +313,17 @@ def _decode_cursor(cursor: str) -> Tuple[Optional[int], Optional[str]]:
     return None, None
 
 
+def _valid_list_cursor(cursor: Optional[str]) -> Optional[str]:
+    """The cursor if it is a well-formed list_sessions cursor, else None."""
+    if not cursor or not isinstance(cursor, str):
+        return None
+    try:
+        _, _, session_id = db._parse_cursor(cursor)
+    except ValueError:
+        return None
+    return cursor if _is_uuid(session_id) else None
+
+
 # ============================================
 # HistoryService Class
 # ============================================
@@ -325,11 +338,44 @@ class HistoryService:
     
     def __init__(self):
         """Initialize the service and ensure database is ready."""
+        # (sessionId, limit) -> (updatedAt, messageCount, messages) from load_session
+        self._load_cache: Dict[Tuple[str, int], Tuple[str, int, List[Dict[str, Any]]]] = {}
+        self._load_cache_lock = threading.Lock()
         try:
             db.init_database()
         except Exception:
             pass  # Database init failure handled per-operation
     
+    def _load_messages(self, session: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """
+        Messages for load_session, reused while the session is unchanged.
+        
+        Every write to a session moves its updatedAt or messageCount, so a
+        cached page is served only while both still match the session header.
+        Callers get their own copy of the list; the message dicts are shared
+        and must be treated as read-only.
+        """
+        key = (session['id'], limit)
+        version = (session['updatedAt'], session['messageCount'])
+        with self._load_cache_lock:
+            cached = self._load_cache.get(key)
+        if cached is not None and cached[:2] == version:
+            return list(cached[2])
+        
+        messages = db.get_messages_page(session['id'], limit=limit)
+        with self._load_cache_lock:
+            self._load_cache.pop(key, None)
+            if len(self._load_cache) >= LOAD_CACHE_SIZE:
+                del self._load_cache[next(iter(self._load_cache))]  # Oldest entry
+            self._load_cache[key] = version + (messages,)
+        return list(messages)
+    
+    def _forget_loaded(self, session_id: str):
+        """Drop cached message pages for a session."""
+        with self._load_cache_lock:
+            for key in [key for key in self._load_cache if key[0] == session_id]:
+                del self._load_cache[key]
+    
     def list_sessions(
         self,
         limit: Optional[int] = None,
@@ -340,7 +386,7 @@ class HistoryService:
         
         Args:
             limit: Maximum sessions to return (default 50, max 100)
-            cursor: Pagination cursor (format: "updatedAt:sessionId")
+            cursor: Pagination cursor (format: "pinned:updatedAt:sessionId")
             
         Returns:
             ServiceResult with data:
@@ -356,58 +402,12 @@ class HistoryService:
                                           max_val=MAX_SESSIONS_PER_PAGE,
                                           default=DEFAULT_SESSIONS_PER_PAGE)
             
-            # Decode cursor for pagination
-            cursor_ts, cursor_id = _decode_cursor(cursor) if cursor else (None, None)
+            # Keyset-paginated listing (sessions + nextCursor);
+            # invalid cursors restart from the first page
+            data = db.list_sessions(limit=limit_val, cursor=_valid_list_cursor(cursor))
+            
+            return ServiceResult(success=True, data=data)
             
-            # Get sessions from database
-            conn = db.get_connection()
-            try:
-                cursor_db = conn.cursor()
-                
-                if cursor_ts is not None and cursor_id is not None:
-                    # Cursor-based pagination: get sessions before cursor position
-                    cursor_db.execute('''
-                        SELECT * FROM sessions 
-                        WHERE (updatedAt < ? OR (updatedAt = ? AND id < ?))
-                        ORDER BY pinned DESC, updatedAt DESC, id DESC
-                        LIMIT ?
-                    ''', (cursor_ts, cursor_ts, cursor_id, limit_val + 1))
-                else:
-                    # First page
-                    cursor_db.execute('''
-                        SELECT * FROM sessions 
-                        ORDER BY pinned DESC, updatedAt DESC, id DESC
-                        LIMIT ?
-                    ''', (limit_val + 1,))
-                
-                rows = cursor_db.fetchall()
-                
-                # Check if there's a next page
-                has_more = len(rows) > limit_val
-                if has_more:
-                    rows = rows[:limit_val]
-                
-                # Convert rows to session dicts
-                sessions = [db._row_to_session(row, cursor_db) for row in rows]
-                
-                # Generate next cursor
-                next_cursor = None
-                if has_more and sessions:
-                    last = sessions[-1]
-                    # Convert ISO timestamp back to int for cursor
-                    last_ts = db._iso_to_ts(last['updatedAt'])
-                    next_cursor = _encode_cursor(last_ts, last['id'])
-                
-                return ServiceResult(
-                    success=True,
-                    data={
-                        'sessions': sessions,
-                        'nextCursor': next_cursor
-                    }
-                )
-            finally:
-                conn.close()
-                
         except Exception as e:
             return ServiceResult(
                 success=False,
@@ -488,32 +488,20 @@ class HistoryService:
                                           max_val=MAX_MESSAGES_PER_LOAD,
                                           default=DEFAULT_MESSAGES_PER_LOAD)
             
-            # Get session (allow local sessions to pass through)
-            is_local = session_id.startswith(('local_', 'mock_', 'temp_'))
-            session = db.get_session(session_id) if not is_local else None
-            if session is None and not is_local:
-                return ServiceResult(
-                    success=False,
-                    error_code='NOT_FOUND',
-                    error_message=f"Session not found: {session_id}"
-                )
-            
-            # Get messages with limit
-            conn = db.get_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM messages 
-                    WHERE sessionId = ? 
-                    ORDER BY ts DESC
-                    LIMIT ?
-                ''', (session_id, limit_val))
-                rows = cursor.fetchall()
-                
-                # Reverse to get chronological order
-                messages = [db._row_to_message(row) for row in reversed(rows)]
-            finally:
-                conn.close()
+            # Get the most recent messages, in chronological order.
+            # Local sessions have no session row and pass through uncached.
+            if session_id.startswith(('local_', 'mock_', 'temp_')):
+                session = None
+                messages = db.get_messages_page(session_id, limit=limit_val)
+            else:
+                session = db.get_session(session_id)
+                if session is None:
+                    return ServiceResult(
+                        success=False,
+                        error_code='NOT_FOUND',
+                        error_message=f"Session not found: {session_id}"
+                    )
+                messages = self._load_messages(session, limit_val)
             
             # Log load event
             db.log_event(session_id, 'session_loaded', {'messageCount': len(messages)})
@@ -629,6 +617,7 @@ class HistoryService:
             
             # Delete session (cascades to messages and events)
             success = db.delete_session(session_id)
+            self._forget_loaded(session_id)
             
             return ServiceResult(
                 success=True,
@@ -805,8 +794,7 @@ class HistoryService:
             
             if should_auto_title:
                 # Check if session has no existing messages (first message)
-                existing_msgs = db.get_messages(session_id)
-                if not existing_msgs:
+                if not session.get('messageCount'):
                     # Get first user message content for auto-title
                     first_user_msg = next(
                         (m for m in validated_messages if m['role'] == 'user'), 
@@ -826,25 +814,13 @@ class HistoryService:
                     }
                 )
             
-            # Append messages to database
-            for msg in validated_messages:
-                meta = {'status': msg.get('status', 'complete')} if 'status' in msg else None
-                db.add_message(
-                    session_id=session_id,
-                    role=msg['role'],
-                    content=msg['content'],
-                    message_id=msg.get('id'),
-                    ts=msg.get('ts') if isinstance(msg.get('ts'), int) else None,
-                    meta=meta
-                )
+            # Append messages to database (one transaction; returns the updated session)
+            session = db.add_messages(session_id, validated_messages)
             
             # Log events
             for evt in validated_events:
                 db.log_event(session_id, evt['type'], evt.get('data'))
             
-            # Get updated session
-            session = db.get_session(session_id)
-            
             return ServiceResult(
                 success=True,
                 data={
@@ -959,11 +935,14 @@ class HistoryService:
 
 # Global service instance
 _service: Optional[HistoryService] = None
+_singleton_lock = threading.Lock()
 
 
 def get_service() -> HistoryService:
     """Get or create the singleton service instance."""
     global _service
     if _service is None:
-        _service = HistoryService()
+        with _singleton_lock:
+            if _service is None:
+                _service = HistoryService()
     return _service
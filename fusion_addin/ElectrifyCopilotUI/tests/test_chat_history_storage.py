@@ -0,0 +1,364 @@
+"""
+Chat History Storage Tests
+==========================
+Focused tests for the storage layer behind the chat history service:
+- Background event flusher lifecycle
+- Keyset cursor paging of list_sessions with pinned sessions
+- FTS5 content search: migration, query escaping and index sync
+- HistoryService.load_session message page cache and its invalidation
+- Batched add_messages, with and without UPDATE ... RETURNING
+
+Run with: python -m pytest tests/test_chat_history_storage.py -v
+"""
+
+import shutil
+import time
+
+from .test_chat_history import (
+    HistoryService,
+    TestFixtures,
+    chat_history,
+    get_data,
+    patch_db_path,
+)
+
+
+class TestEventFlusher:
+    """Test the background log_event flusher"""
+
+    def setup_method(self):
+        self.db_path, self.temp_dir = TestFixtures.create_temp_db()
+        patch_db_path(self.db_path)
+        chat_history.init_database()
+
+    def teardown_method(self):
+        chat_history.close_pool()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_close_pool_stops_flusher(self):
+        """close_pool() stops the flusher after writing pending events"""
+        flusher = chat_history._event_flusher
+        assert flusher is not None and flusher.is_alive()
+
+        session_id = chat_history.create_session("Events")['id']
+        chat_history.log_event(session_id, 'test_event', {'n': 1})
+        chat_history.close_pool()
+
+        assert not flusher.is_alive()
+        assert chat_history._event_flusher is None
+        assert len(chat_history.get_events(session_id, 'test_event')) == 1
+
+    def test_reload_replaces_flusher(self):
+        """A reload (close_pool + init_database) runs one new flusher, not two"""
+        old_flusher = chat_history._event_flusher
+        chat_history.close_pool()
+        chat_history.init_database()
+        new_flusher = chat_history._event_flusher
+        chat_history.init_database()
+
+        assert not old_flusher.is_alive()
+        assert new_flusher.is_alive()
+        assert chat_history._event_flusher is new_flusher
+
+
+class TestKeysetPaging:
+    """Test list_sessions keyset cursors across pinned and unpinned sessions"""
+
+    def setup_method(self):
+        self.db_path, self.temp_dir = TestFixtures.create_temp_db()
+        patch_db_path(self.db_path)
+        chat_history.init_database()
+
+        # Six sessions with distinct updatedAt; two older ones are pinned
+        self.ids = [chat_history.create_session(f"Session {i}")['id'] for i in range(6)]
+        with chat_history.borrow(write=True) as conn:
+            for i, session_id in enumerate(self.ids):
+                conn.execute('UPDATE sessions SET updatedAt = ?, pinned = ? WHERE id = ?',
+                             (1_000 + i, int(i in (1, 2)), session_id))
+            conn.commit()
+
+    def teardown_method(self):
+        chat_history.close_pool()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _walk(self, limit):
+        pages, cursor = [], None
+        while True:
+            page = chat_history.list_sessions(limit=limit, cursor=cursor)
+            pages.append([s['id'] for s in page['sessions']])
+            cursor = page['nextCursor']
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_listing_order(self):
+        """Pinned first (newest first), then the rest; no gaps or repeats"""
+        expected = [self.ids[i] for i in (2, 1, 5, 4, 3, 0)]
+        for limit in (1, 2, 4, 6):
+            pages = self._walk(limit)
+            assert [sid for page in pages for sid in page] == expected, f"limit={limit}"
+            assert all(len(page) <= limit for page in pages)
+
+    def test_cursor_at_last_pinned_session(self):
+        """A page ending on a pinned session continues with unpinned ones"""
+        first = chat_history.list_sessions(limit=2)
+        assert [s['id'] for s in first['sessions']] == [self.ids[2], self.ids[1]]
+        assert first['nextCursor'] == f"1:1001:{self.ids[1]}"
+
+        second = chat_history.list_sessions(limit=2, cursor=first['nextCursor'])
+        assert [s['id'] for s in second['sessions']] == [self.ids[5], self.ids[4]]
+
+    def test_cursor_session_deleted_between_pages(self):
+        """The boundary comes from the cursor, not the cursor row's current state"""
+        first = chat_history.list_sessions(limit=1)
+        assert [s['id'] for s in first['sessions']] == [self.ids[2]]
+        chat_history.delete_session(self.ids[2])
+
+        second = chat_history.list_sessions(limit=1, cursor=first['nextCursor'])
+        assert [s['id'] for s in second['sessions']] == [self.ids[1]]
+
+    def test_cursor_session_unpinned_between_pages(self):
+        first = chat_history.list_sessions(limit=1)
+        chat_history.update_session(self.ids[2], pinned=False)
+
+        rest = chat_history.list_sessions(limit=6, cursor=first['nextCursor'])
+        assert self.ids[1] in [s['id'] for s in rest['sessions']]
+
+    def test_last_page_has_no_cursor(self):
+        page = chat_history.list_sessions(limit=6)
+        assert len(page['sessions']) == 6
+        assert page['nextCursor'] is None
+
+
+class TestFullTextSearch:
+    """Test the FTS5 message index behind search_sessions and list_sessions"""
+
+    def setup_method(self):
+        self.db_path, self.temp_dir = TestFixtures.create_temp_db()
+        patch_db_path(self.db_path)
+        chat_history.init_database()
+        self.session_id = chat_history.create_session("Filters")['id']
+
+    def teardown_method(self):
+        chat_history.close_pool()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _search_ids(self, query):
+        return [s['id'] for s in chat_history.search_sessions(query)['sessions']]
+
+    def test_fts_enabled(self):
+        assert chat_history._fts_enabled
+        assert chat_history.get_schema_version() == chat_history.CURRENT_SCHEMA_VERSION
+
+    def test_migration_indexes_existing_messages(self):
+        """Messages written before the FTS table existed are found after migrating"""
+        chat_history.add_message(self.session_id, 'user', 'Design a low-pass filter')
+        with chat_history.borrow(write=True) as conn:
+            for trigger in ('messages_fts_ai', 'messages_fts_ad', 'messages_fts_au'):
+                conn.execute(f'DROP TRIGGER {trigger}')
+            conn.execute('DROP TABLE messages_fts')
+            conn.commit()
+        chat_history.close_pool()
+
+        chat_history.init_database()
+        assert chat_history._fts_enabled
+        assert self._search_ids('low-pass') == [self.session_id]
+
+    def test_query_syntax_is_escaped(self):
+        """FTS5 operators and quotes in user text are matched literally"""
+        chat_history.add_message(self.session_id, 'user', 'He said "use a 10k OR 4.7k resistor" NEAR the op-amp')
+        for query in ('"use a 10k', '10k OR 4.7k', 'NEAR(', 'op-amp', 'content:said', '*', '-'):
+            chat_history.search_sessions(query)  # Must not raise
+            chat_history.list_sessions(search_query=query)
+        assert self._search_ids('10k OR 4.7k') == [self.session_id]
+        assert self._search_ids('"use a 10k') == [self.session_id]
+        assert self._search_ids('10k AND capacitor') == []
+
+    def test_prefix_match_and_snippet(self):
+        """The last word matches as a prefix, as partially typed text did with LIKE"""
+        chat_history.add_message(self.session_id, 'assistant', 'A simple RC network uses a capacitor')
+        result = chat_history.search_sessions('capac')
+        assert [s['id'] for s in result['sessions']] == [self.session_id]
+        assert result['sessions'][0]['matchType'] == 'content'
+        assert result['sessions'][0]['matchCount'] == 1
+        assert 'capacitor' in result['sessions'][0]['snippet']
+        assert result['totalMatches'] == 1
+
+    def test_handler_search_uses_fts(self):
+        """history_search goes through search_sessions (snippets, match counts)"""
+        chat_history.add_message(self.session_id, 'user', 'Why does my "buck" converter ring?')
+        response = chat_history.ChatHistoryHandler().handle(
+            'history_search', {'requestId': 'r1', 'payload': {'query': '"buck" conv'}}
+        )
+        assert response['action'] == 'history_list_result'
+        sessions = response['payload']['sessions']
+        assert [s['id'] for s in sessions] == [self.session_id]
+        assert 'converter' in sessions[0]['snippet']
+        assert response['payload']['totalMatches'] == 1
+
+    def test_index_follows_updates_and_deletes(self):
+        chat_history.save_session_messages(self.session_id, [
+            {'role': 'user', 'content': 'first draft about inductors'},
+        ])
+        assert self._search_ids('inductors') == [self.session_id]
+
+        chat_history.save_session_messages(self.session_id, [
+            {'role': 'user', 'content': 'rewritten to mention diodes'},
+        ])
+        assert self._search_ids('inductors') == []
+        assert self._search_ids('diodes') == [self.session_id]
+
+        chat_history.delete_session(self.session_id)
+        assert self._search_ids('diodes') == []
+
+
+class TestLoadCache:
+    """Test that load_session reuses message pages only while a session is unchanged"""
+
+    def setup_method(self):
+        self.db_path, self.temp_dir = TestFixtures.create_temp_db()
+        patch_db_path(self.db_path)
+        self.service = HistoryService()
+        self.session_id = get_data(self.service.create_session("Cached"), 'session')['id']
+        self.service.append_messages(self.session_id, TestFixtures.generate_messages(3, prefix='c_'))
+
+        # Count page reads that reach the database
+        self.page_reads = 0
+        self.get_messages_page = chat_history.get_messages_page
+
+        def counting_get_messages_page(*args, **kwargs):
+            self.page_reads += 1
+            return self.get_messages_page(*args, **kwargs)
+
+        chat_history.get_messages_page = counting_get_messages_page
+
+    def teardown_method(self):
+        chat_history.get_messages_page = self.get_messages_page
+        chat_history.close_pool()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _load(self, limit=None):
+        return get_data(self.service.load_session(self.session_id, limit), 'messages')
+
+    def test_unchanged_session_reuses_page(self):
+        first = self._load()
+        assert len(first) == 3
+        assert self._load() == first
+        assert self.page_reads == 1
+
+    def test_callers_get_their_own_list(self):
+        """Mutating a returned list does not corrupt later loads"""
+        first = self._load()
+        first.clear()
+        assert len(self._load()) == 3
+        assert self.page_reads == 1
+
+    def test_limit_is_part_of_the_key(self):
+        full = self._load()
+        last_two = self._load(2)
+        assert [m['id'] for m in last_two] == [m['id'] for m in full[1:]]
+        assert self._load() == full
+        assert self.page_reads == 2
+
+    def test_append_invalidates(self):
+        self._load()
+        self.service.append_messages(self.session_id, TestFixtures.generate_messages(1, prefix='new_'))
+        second = self._load()
+        assert self.page_reads == 2
+        assert [m['id'] for m in second][-1] == 'msg_new_0000'
+
+    def test_rewrite_with_same_count_invalidates(self):
+        """save_session_messages moves updatedAt even when the count is unchanged"""
+        first = self._load()
+        time.sleep(0.002)  # updatedAt has millisecond resolution
+        chat_history.save_session_messages(self.session_id, [
+            {'id': f'msg_r_{i}', 'role': 'user', 'content': f'rewritten {i}'} for i in range(3)
+        ])
+        assert [m['content'] for m in self._load()] == [f'rewritten {i}' for i in range(3)]
+        assert first[0]['content'] != 'rewritten 0'
+
+    def test_delete_forgets_pages(self):
+        self._load()
+        self.service.delete_session(self.session_id)
+        assert not self.service._load_cache
+        result = self.service.load_session(self.session_id)
+        assert not result.success and result.error_code == 'NOT_FOUND'
+
+
+class TestAddMessages:
+    """Test add_messages on both the RETURNING and the re-select path"""
+
+    def setup_method(self):
+        self.db_path, self.temp_dir = TestFixtures.create_temp_db()
+        patch_db_path(self.db_path)
+        chat_history.init_database()
+        self.has_returning = chat_history._HAS_RETURNING
+
+    def teardown_method(self):
+        chat_history._HAS_RETURNING = self.has_returning
+        chat_history.close_pool()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _each_path(self):
+        """Yield once per add_messages code path (RETURNING if supported, then without)"""
+        for returning in sorted({self.has_returning, False}, reverse=True):
+            chat_history._HAS_RETURNING = returning
+            yield returning
+
+    def test_returns_updated_session(self):
+        for returning in self._each_path():
+            session_id = chat_history.create_session()['id']
+            session = chat_history.add_messages(session_id, [
+                {'role': 'assistant', 'content': 'Hello, how can I help?', 'ts': 1_700_000_000_000},
+                {'role': 'user', 'content': 'Size a decoupling capacitor', 'ts': 1_700_000_000_500},
+                {'role': 'assistant', 'content': 'Use 100nF per supply pin', 'ts': 1_700_000_001_000},
+            ])
+            assert session['id'] == session_id, f"returning={returning}"
+            assert session['messageCount'] == 3
+            assert session['preview'] == 'Use 100nF per supply pin'
+            assert session['updatedAt'] == chat_history._ts_to_iso(1_700_000_001_000)
+            # Auto-title from the first user message
+            assert session['title'] == 'Size a decoupling capacitor'
+            assert session == chat_history.get_session(session_id)
+
+    def test_user_title_is_kept(self):
+        for returning in self._each_path():
+            session_id = chat_history.create_session("My title")['id']
+            session = chat_history.add_messages(session_id, [{'role': 'user', 'content': 'hi'}])
+            assert session['title'] == 'My title', f"returning={returning}"
+
+    def test_missing_session_inserts_nothing(self):
+        """No existence pre-check: the insert itself skips unknown sessions"""
+        for returning in self._each_path():
+            missing_id = TestFixtures.generate_session_id()
+            assert chat_history.add_messages(missing_id, [{'role': 'user', 'content': 'lost'}]) is None
+            with chat_history.borrow() as conn:
+                count = conn.execute(
+                    'SELECT COUNT(*) FROM messages WHERE sessionId = ?', (missing_id,)
+                ).fetchone()[0]
+            assert count == 0, f"returning={returning}"
+
+    def test_cached_session_is_refreshed(self):
+        """get_session's TTL cache is invalidated by the append"""
+        for returning in self._each_path():
+            session_id = chat_history.create_session()['id']
+            assert chat_history.get_session(session_id)['messageCount'] == 0
+            chat_history.add_messages(session_id, [{'role': 'user', 'content': 'one'}])
+            assert chat_history.get_session(session_id)['messageCount'] == 1, f"returning={returning}"
+
+    def test_status_matches_save_session_messages(self):
+        """An empty status is stored the same way by both write paths"""
+        msg = {'role': 'assistant', 'content': 'x', 'status': ''}
+
+        def stored(session_id):
+            with chat_history.borrow() as conn:
+                row = conn.execute(
+                    'SELECT metaJson, status FROM messages WHERE sessionId = ?', (session_id,)
+                ).fetchone()
+            return tuple(row)
+
+        saved_id = chat_history.create_session()['id']
+        chat_history.save_session_messages(saved_id, [dict(msg)])
+        for returning in self._each_path():
+            session_id = chat_history.create_session()['id']
+            chat_history.add_messages(session_id, [dict(msg)])
+            assert stored(session_id) == stored(saved_id), f"returning={returning}"
@@ -39,6 +39,9 @@ SNAPSHOT_PATH = BRIDGE_DIR / "snapshot.json"
 # Snapshot metadata (timestamp, version, etc.)
 SNAPSHOT_META_PATH = BRIDGE_DIR / "snapshot.meta.json"
 
+# Snapshot + metadata in one atomically replaced file: {"snapshot": ..., "meta": ...}
+SNAPSHOT_BUNDLE_PATH = BRIDGE_DIR / "snapshot.bundle.json"
+
 # Actions to execute (from Backend → Fusion)
 ACTIONS_PATH = BRIDGE_DIR / "actions.json"
 
@@ -81,6 +84,20 @@ ensure_bridge_dir()
 # -----------------------------------------------------------------------------
 # Helper Functions
 # -----------------------------------------------------------------------------
+def _scan_bridge_dir():
+    """
+    List regular files in BRIDGE_DIR with a single directory scan.
+    
+    Returns:
+        dict of file name -> os.DirEntry, or None if BRIDGE_DIR is missing
+    """
+    try:
+        with os.scandir(BRIDGE_DIR) as it:
+            return {entry.name: entry for entry in it if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
 def get_bridge_status():
     """
     Get status of all bridge files.
@@ -91,20 +108,25 @@ def get_bridge_status():
     files = {
         "snapshot": SNAPSHOT_PATH,
         "snapshot_meta": SNAPSHOT_META_PATH,
+        "snapshot_bundle": SNAPSHOT_BUNDLE_PATH,
         "actions": ACTIONS_PATH,
         "exec_report": EXEC_REPORT_PATH,
         "snapshot_request": SNAPSHOT_REQUEST_PATH,
     }
     
+    entries = _scan_bridge_dir()
+    
     status = {
         "bridge_dir": str(BRIDGE_DIR),
-        "bridge_exists": BRIDGE_DIR.exists(),
+        "bridge_exists": entries is not None,
         "files": {}
     }
+    entries = entries or {}
     
     for name, path in files.items():
-        if path.exists():
-            stat = path.stat()
+        entry = entries.get(path.name)
+        if entry is not None:
+            stat = entry.stat()
             status["files"][name] = {
                 "exists": True,
                 "path": str(path),
@@ -132,16 +154,18 @@ def clear_bridge_files():
     files = [
         SNAPSHOT_PATH,
         SNAPSHOT_META_PATH,
+        SNAPSHOT_BUNDLE_PATH,
         ACTIONS_PATH,
         EXEC_REPORT_PATH,
         SNAPSHOT_REQUEST_PATH,
     ]
     
+    entries = _scan_bridge_dir() or {}
     removed = []
     errors = []
     
     for path in files:
-        if path.exists():
+        if path.name in entries:
             try:
                 path.unlink()
                 removed.append(str(path))
@@ -184,6 +208,7 @@ __all__ = [
     "BRIDGE_DIR",
     "SNAPSHOT_PATH",
     "SNAPSHOT_META_PATH",
+    "SNAPSHOT_BUNDLE_PATH",
     "ACTIONS_PATH",
     "EXEC_REPORT_PATH",
     "SNAPSHOT_REQUEST_PATH",
@@ -0,0 +1,145 @@
+"""
+Bridge payload codec: JSON by default, MessagePack on request.
+
+This is the single implementation shared by both sides of the bridge; the
+backend's backend/src/config/bridge_codec.py loads this file rather than
+keeping a copy, so both sides encode and decode bridge files identically.
+
+Bridge files written through this module are indented JSON unless MessagePack
+output is enabled (smaller on disk and much faster to parse, but opaque to
+editors and to a side without msgpack). ``loads`` sniffs the payload, so
+readers accept either format; this matters for the snapshot, which the ULP
+exporter always writes as JSON.
+
+File names keep their ``.json`` suffix so both sides agree on paths
+regardless of the encoding in use.
+
+Environment Variables:
+    ELECTRIFY_BRIDGE_MSGPACK: Set to "1" to write MessagePack (requires msgpack
+        on both sides of the bridge)
+
+Note: Fusion 360's bundled Python usually has neither msgpack nor orjson, so
+this module must stay importable with the stdlib alone.
+"""
+import codecs
+import json
+import os
+from pathlib import Path
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+
+    def _digest(buf: bytes) -> int:
+        return xxhash.xxh3_64_intdigest(buf)
+except ImportError:
+    _digest = hash
+
+# Write MessagePack only when explicitly enabled and available
+USE_MSGPACK = msgpack is not None and os.getenv("ELECTRIFY_BRIDGE_MSGPACK", "0") == "1"
+
+# path -> (payload digest, st_mtime_ns, st_size) of the last write()
+_last_written = {}
+
+
+def _is_json(buf: bytes) -> bool:
+    """Bridge payloads are maps/arrays: JSON starts with '{' or '[', MessagePack never does."""
+    head = buf[:16].lstrip()
+    return not head or head[:1] in (b"{", b"[")
+
+
+def dumps(obj) -> bytes:
+    """Encode a bridge payload."""
+    if USE_MSGPACK:
+        return msgpack.packb(obj, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def loads(buf: bytes):
+    """
+    Decode a bridge payload written as either MessagePack or JSON.
+
+    Raises:
+        ValueError: If the payload is malformed, or is MessagePack and
+            msgpack is not installed
+    """
+    if buf.startswith(codecs.BOM_UTF8):
+        buf = buf[len(codecs.BOM_UTF8):]
+
+    if _is_json(buf):
+        return orjson.loads(buf) if orjson is not None else json.loads(buf)
+
+    if msgpack is None:
+        raise ValueError("Bridge payload is MessagePack but msgpack is not installed")
+    return msgpack.unpackb(buf, raw=False)
+
+
+def dumps_compact(obj) -> bytes:
+    """Encode obj as compact JSON (no whitespace), regardless of USE_MSGPACK."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def read(path):
+    """Read and decode a bridge file."""
+    return loads(Path(path).read_bytes())
+
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def write(path, obj) -> bool:
+    """
+    Encode and write a bridge file atomically.
+
+    Writes to a sibling .tmp file, fsyncs, then renames over path, so a
+    reader never sees a partially written payload.
+
+    The write is skipped when the payload matches the previous write to path
+    and the file has not been touched since (no spurious watcher events).
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    buf = dumps(obj)
+    key = os.fspath(path)
+    digest = _digest(buf)
+    last = _last_written.get(key)
+    if last is not None and last[0] == digest and last[1:] == _file_state(path):
+        return False
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _last_written[key] = (digest,) + (_file_state(path) or (None, None))
+    return True
+
+
+__all__ = [
+    "USE_MSGPACK",
+    "dumps",
+    "dumps_compact",
+    "loads",
+    "read",
+    "write",
+]
@@ -12,6 +12,7 @@ from typing import Dict, Any, List
 from dataclasses import dataclass
 from .script_builder import build_script_file_content
 from .action_types import validate_actions_structure
+from . import bridge_codec
 
 
 @dataclass
@@ -183,9 +184,8 @@ def run_actions(
     actions_count = 0
     
     try:
-        # Load actions JSON
-        with open(actions_json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        # Load actions (MessagePack or JSON)
+        data = bridge_codec.read(actions_json_path)
         
         # Extract actions array
         if isinstance(data, dict) and "actions" in data:
@@ -287,6 +287,8 @@ def run_actions(
         errors.append(f"Actions file not found: {actions_json_path}")
     except json.JSONDecodeError as e:
         errors.append(f"Invalid JSON: {str(e)}")
+    except ValueError as e:
+        errors.append(f"Invalid actions payload: {str(e)}")
     except Exception as e:
         errors.append(f"Unexpected error: {str(e)}")
     
@@ -348,19 +350,16 @@ def test_ulp_execution(ulp_path: str, args: str = None) -> Dict[str, Any]:
     success, errors = _execute_ulp_in_fusion(ulp_path, args)
     
     # Build result message
-    if success:
-        msg = f"✓ ULP executed successfully\n"
-        msg += f"  Path: {ulp_path}\n"
-        if args:
-            msg += f"  Args: {args}\n"
-    else:
-        msg = f"✗ ULP execution failed\n"
-        msg += f"  Path: {ulp_path}\n"
-        if args:
-            msg += f"  Args: {args}\n"
-        msg += f"  Errors: {len(errors)}\n"
-        for err in errors:
-            msg += f"    • {err}\n"
+    parts = [
+        "✓ ULP executed successfully\n" if success else "✗ ULP execution failed\n",
+        f"  Path: {ulp_path}\n",
+    ]
+    if args:
+        parts.append(f"  Args: {args}\n")
+    if not success:
+        parts.append(f"  Errors: {len(errors)}\n")
+        parts.extend(f"    • {err}\n" for err in errors)
+    msg = "".join(parts)
     
     return {
         "success": success,
@@ -407,15 +406,14 @@ def test_script_execution(script_path: str) -> Dict[str, Any]:
     success, errors = _execute_script_in_fusion(script_path)
     
     # Build result message
-    if success:
-        msg = f"✓ Script executed successfully\n"
-        msg += f"  Path: {script_path}\n"
-    else:
-        msg = f"✗ Script execution failed\n"
-        msg += f"  Path: {script_path}\n"
-        msg += f"  Errors: {len(errors)}\n"
-        for err in errors:
-            msg += f"    • {err}\n"
+    parts = [
+        "✓ Script executed successfully\n" if success else "✗ Script execution failed\n",
+        f"  Path: {script_path}\n",
+    ]
+    if not success:
+        parts.append(f"  Errors: {len(errors)}\n")
+        parts.extend(f"    • {err}\n" for err in errors)
+    msg = "".join(parts)
     
     return {
         "success": success,